@@ -0,0 +1,357 @@
+"""
+Drive a mixed workload against the API at a fixed concurrency and report
+throughput, latency percentiles and DB queries per request for each
+endpoint, so builds can be compared before they are deployed.
+
+Usage (from the backend directory):
+    python benchmarks/load_test.py --posts 5000 --concurrency 32 --duration 20
+    python benchmarks/load_test.py --server uvicorn --mix list=50,get=30,stats=20 --output load.json
+
+Runs against a throwaway SQLite file unless --database-url is given; the
+exported DATABASE_URL is ignored. The posts and tags of that database are
+deleted and reseeded, so --database-url also needs --destroy-data.
+
+--server inprocess (the default) calls the ASGI app directly on the
+harness's event loop. --server uvicorn starts a local uvicorn server on a
+free port and goes through real HTTP connections.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+DEFAULT_MIX = "list=35,get=30,create=10,submit=10,publish=5,stats=10"
+
+WORDS = (
+    "garden water light morning people city river design project simple friendly "
+    "article reader story travel coffee music season market update guide team "
+    "practical careful useful quiet bright history future method detail review"
+).split()
+
+
+def parse_mix(value: str) -> Dict[str, int]:
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        if name.strip() not in OPERATIONS:
+            raise argparse.ArgumentTypeError(f"unknown operation {name!r}; choose from {', '.join(OPERATIONS)}")
+        mix[name.strip()] = int(weight or 1)
+    return mix
+
+
+def _text(rng: random.Random, sentences: int) -> str:
+    return " ".join(
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 14))).capitalize() + "."
+        for _ in range(sentences)
+    )
+
+
+def resolve_database_url(requested: Optional[str]) -> str:
+    """Use the requested database, or a temporary SQLite file when none is requested or Postgres does not answer."""
+    if requested and requested.startswith("postgresql"):
+        from sqlalchemy import create_engine, text
+
+        probe = create_engine(requested)
+        try:
+            with probe.connect() as conn:
+                conn.execute(text("SELECT 1"))
+            return requested
+        except Exception as exc:
+            print(f"Postgres not reachable ({type(exc).__name__}), falling back to SQLite")
+        finally:
+            probe.dispose()
+    elif requested:
+        return requested
+    return "sqlite:///" + os.path.join(tempfile.mkdtemp(), "load_test.db")
+
+
+def seed_posts(database, models, crud, count: int, batch_size: int = 5000) -> Dict[str, List[int]]:
+    """Replace the posts with `count` synthetic ones; returns the ids per status."""
+    engine = database.engine
+    rng = random.Random(7)
+    now = datetime.now()
+    table = models.Post.__table__
+    with engine.begin() as conn:
+        conn.execute(models.PostTag.__table__.delete())
+        conn.execute(models.Tag.__table__.delete())
+        conn.execute(table.delete())
+        for start in range(0, count, batch_size):
+            rows = []
+            for _ in range(start, min(count, start + batch_size)):
+                status = rng.choices(crud.POST_STATUSES, weights=[3, 1, 2, 4])[0]
+                created_at = now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+                rows.append({
+                    "title": _text(rng, 1)[:80],
+                    "content": _text(rng, rng.randint(4, 20)),
+                    "status": status,
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                    "published_at": created_at + timedelta(hours=1) if status == "published" else None,
+                })
+            conn.execute(table.insert(), rows)
+        ids = defaultdict(list)
+        for post_id, status in conn.execute(table.select().with_only_columns(table.c.id, table.c.status)):
+            ids[status].append(post_id)
+
+    session = database.SessionLocal()
+    try:
+        crud.reconcile_status_counts(session)
+    finally:
+        session.close()
+    return ids
+
+
+class Workload:
+    """Picks operations by weight and keeps track of which posts can be submitted or published."""
+
+    def __init__(self, mix: Dict[str, int], ids: Dict[str, List[int]], seed: int = 11):
+        self.rng = random.Random(seed)
+        self.names = list(mix)
+        self.weights = [mix[name] for name in self.names]
+        self.all_ids = [post_id for status_ids in ids.values() for post_id in status_ids]
+        self.drafts = deque(ids.get("draft", []))
+        self.approved = deque(ids.get("approved", []))
+
+    def next_operation(self) -> str:
+        return self.rng.choices(self.names, weights=self.weights)[0]
+
+
+async def op_list(client, workload: Workload):
+    status = workload.rng.choice([None, None, "published", "draft"])
+    return await client.get("/posts/", params={"limit": 20, **({"status": status} if status else {})})
+
+
+async def op_get(client, workload: Workload):
+    return await client.get(f"/posts/{workload.rng.choice(workload.all_ids)}")
+
+
+async def op_create(client, workload: Workload):
+    response = await client.post("/posts/", json={
+        "title": _text(workload.rng, 1)[:80],
+        "content": _text(workload.rng, workload.rng.randint(4, 12)),
+        "tags": ", ".join(workload.rng.sample(WORDS, 2)),
+    })
+    if response.status_code == 200:
+        post_id = response.json()["id"]
+        workload.drafts.append(post_id)
+        workload.all_ids.append(post_id)
+    return response
+
+
+async def op_submit(client, workload: Workload):
+    if not workload.drafts:
+        return await op_create(client, workload)
+    response = await client.post(f"/posts/{workload.drafts.popleft()}/submit/")
+    if response.status_code == 200 and response.json()["status"] == "approved":
+        workload.approved.append(response.json()["id"])
+    return response
+
+
+async def op_publish(client, workload: Workload):
+    if not workload.approved:
+        return await op_submit(client, workload)
+    return await client.patch(f"/posts/{workload.approved.popleft()}/publish/")
+
+
+async def op_stats(client, workload: Workload):
+    return await client.get("/stats/")
+
+
+OPERATIONS = {
+    "list": op_list,
+    "get": op_get,
+    "create": op_create,
+    "submit": op_submit,
+    "publish": op_publish,
+    "stats": op_stats,
+}
+
+
+def count_queries(engines):
+    """Count statements sent through the given engines."""
+    from sqlalchemy import event
+
+    counter = {"queries": 0}
+
+    def before_cursor_execute(*args):
+        counter["queries"] += 1
+
+    for engine in engines:
+        event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    return counter
+
+
+async def calibrate_queries(client, workload: Workload, counter, mix: Dict[str, int], samples: int) -> Dict[str, float]:
+    """Queries per request for each operation, measured one request at a time."""
+    queries = {}
+    for name in mix:
+        before = counter["queries"]
+        for _ in range(samples):
+            await OPERATIONS[name](client, workload)
+        queries[name] = (counter["queries"] - before) / samples
+    return queries
+
+
+async def run_load(client, workload: Workload, concurrency: int, duration: float, max_requests: Optional[int]):
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    issued = 0
+    deadline = time.perf_counter() + duration
+
+    async def worker():
+        nonlocal issued
+        while time.perf_counter() < deadline and (max_requests is None or issued < max_requests):
+            issued += 1
+            name = workload.next_operation()
+            start = time.perf_counter()
+            try:
+                response = await OPERATIONS[name](client, workload)
+                failed = response.status_code >= 500
+            except Exception:
+                failed = True
+            latencies[name].append(time.perf_counter() - start)
+            if failed:
+                errors[name] += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies, errors, time.perf_counter() - started
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, errors, elapsed: float, queries: Dict[str, float]) -> Dict[str, Any]:
+    endpoints = {}
+    for name, values in sorted(latencies.items()):
+        values.sort()
+        endpoints[name] = {
+            "requests": len(values),
+            "errors": errors.get(name, 0),
+            "requests_per_sec": len(values) / elapsed,
+            "p50_ms": statistics.median(values) * 1000,
+            "p95_ms": _percentile(values, 0.95) * 1000,
+            "p99_ms": _percentile(values, 0.99) * 1000,
+            "queries_per_request": queries.get(name),
+        }
+    everything = sorted(value for values in latencies.values() for value in values)
+    return {
+        "elapsed_sec": elapsed,
+        "requests": len(everything),
+        "errors": sum(errors.values()),
+        "requests_per_sec": len(everything) / elapsed if elapsed else 0.0,
+        "p50_ms": statistics.median(everything) * 1000 if everything else None,
+        "p99_ms": _percentile(everything, 0.99) * 1000 if everything else None,
+        "endpoints": endpoints,
+    }
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+async def run(args, app, workload: Workload, counter) -> Dict[str, Any]:
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    if args.server == "uvicorn":
+        import uvicorn
+
+        port = _free_port()
+        server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        while not server.started:
+            await asyncio.sleep(0.05)
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits, timeout=60) as client:
+                queries = await calibrate_queries(client, workload, counter, args.mix, args.calibration)
+                results = await run_load(client, workload, args.concurrency, args.duration, args.requests)
+        finally:
+            server.should_exit = True
+            thread.join()
+    else:
+        async with app.router.lifespan_context(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60) as client:
+                queries = await calibrate_queries(client, workload, counter, args.mix, args.calibration)
+                results = await run_load(client, workload, args.concurrency, args.duration, args.requests)
+    return summarize(*results, queries)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=5000, help="number of posts to seed")
+    parser.add_argument("--concurrency", type=int, default=16, help="requests in flight at once")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds of load")
+    parser.add_argument("--requests", type=int, default=None, help="stop after this many requests")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX, help=f"operation weights (default {DEFAULT_MIX})")
+    parser.add_argument("--calibration", type=int, default=5, help="serial requests per operation for query counts")
+    parser.add_argument("--server", choices=("inprocess", "uvicorn"), default="inprocess")
+    parser.add_argument("--database-url", default=None, help="load this database instead of a throwaway SQLite file")
+    parser.add_argument("--destroy-data", action="store_true", help="confirm that --database-url may be emptied")
+    parser.add_argument("--output", default=None, help="write the JSON report here")
+    args = parser.parse_args()
+    if isinstance(args.mix, str):
+        args.mix = parse_mix(args.mix)
+    if args.database_url and not args.destroy_data:
+        parser.error("--database-url deletes every post and tag in that database; add --destroy-data to confirm")
+
+    database_url = resolve_database_url(args.database_url)
+    os.environ["DATABASE_URL"] = database_url
+    # Reads must hit the seeded database, not a replica from the environment
+    os.environ["DATABASE_REPLICA_URL"] = ""
+
+    import crud
+    import database
+    import models
+    import main as app_main
+
+    models.Base.metadata.create_all(bind=database.engine)
+    print(f"Seeding {args.posts} posts into {database.engine.url.render_as_string(hide_password=True)}")
+    ids = seed_posts(database, models, crud, args.posts)
+
+    engines = {database.async_engine.sync_engine, database.async_read_engine.sync_engine, database.engine}
+    counter = count_queries(engines)
+    workload = Workload(args.mix, ids)
+    report = asyncio.run(run(args, app_main.app, workload, counter))
+    report.update(
+        posts=args.posts, concurrency=args.concurrency, server=args.server,
+        dialect=database.engine.dialect.name, mix=args.mix
+    )
+
+    print(f"\n{report['requests']} requests in {report['elapsed_sec']:.1f}s "
+          f"({report['requests_per_sec']:.0f} req/s, {report['errors']} errors) "
+          f"at concurrency {args.concurrency}, {args.server} server, {report['dialect']}")
+    print(f"{'endpoint':<10}{'requests':>9}{'errors':>8}{'req/s':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'queries':>9}")
+    for name, result in report["endpoints"].items():
+        queries = result["queries_per_request"]
+        print(f"{name:<10}{result['requests']:>9}{result['errors']:>8}{result['requests_per_sec']:>9.1f}"
+              f"{result['p50_ms']:>9.2f}{result['p95_ms']:>9.2f}{result['p99_ms']:>9.2f}"
+              f"{queries if queries is not None else float('nan'):>9.1f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,220 @@
+"""
+Benchmark the moderation functions over a reproducible synthetic corpus and
+optionally compare against a saved baseline, so a slow regex or rule change
+shows up in review instead of in production.
+
+Usage (from the backend directory):
+    python benchmarks/moderation_bench.py --save-baseline bench_baseline.json
+    python benchmarks/moderation_bench.py --baseline bench_baseline.json --tolerance 0.25
+
+The corpus covers short posts, ~10k-character posts, HTML-heavy posts and
+adversarial inputs that stress regex backtracking. Exits with status 1 when
+a function's p50 latency or throughput on any corpus is worse than the
+baseline by more than the tolerance. Baselines are machine specific; record
+them on the machine that runs the comparison.
+"""
+import argparse
+import json
+import random
+import statistics
+import string
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import moderation
+
+SEED = 1234
+
+WORDS = (
+    "garden water light morning people city river design project simple friendly "
+    "article reader story travel coffee music season market update guide team "
+    "practical careful useful quiet bright history future method detail review"
+).split()
+
+
+def _sentence(rng: random.Random, low: int = 6, high: int = 16) -> str:
+    words = [rng.choice(WORDS) for _ in range(rng.randint(low, high))]
+    return " ".join(words).capitalize() + rng.choice([".", ".", ".", "!", "?"])
+
+
+def _paragraph(rng: random.Random, sentences: int) -> str:
+    return " ".join(_sentence(rng) for _ in range(sentences))
+
+
+def _short_post(rng: random.Random) -> Tuple[str, str]:
+    return _paragraph(rng, rng.randint(2, 5)), _sentence(rng, 3, 6)
+
+
+def _long_post(rng: random.Random) -> Tuple[str, str]:
+    paragraphs = []
+    while sum(len(paragraph) for paragraph in paragraphs) < 10000:
+        paragraphs.append(_paragraph(rng, rng.randint(4, 9)))
+    return "\n\n".join(paragraphs)[:10000], _sentence(rng, 4, 8)
+
+
+def _html_post(rng: random.Random) -> Tuple[str, str]:
+    parts = []
+    for _ in range(rng.randint(10, 30)):
+        tag = rng.choice(["p", "div", "span", "strong", "em", "li", "blockquote"])
+        parts.append(f'<{tag} class="c{rng.randint(0, 9)}" data-id="{rng.randint(0, 999)}">{_sentence(rng)}</{tag}>')
+        if rng.random() < 0.3:
+            parts.append(f'<img src="/img/{rng.randint(0, 99)}.png" alt="{rng.choice(WORDS)}"/>')
+    return "\n".join(parts), _sentence(rng, 3, 6)
+
+
+def _adversarial_post(rng: random.Random) -> Tuple[str, str]:
+    size = rng.randint(1000, 2000)
+    content = rng.choice([
+        # Long word with no repeats: worst case for the repeated-characters pattern
+        lambda: "".join(rng.choice(string.ascii_lowercase) for _ in range(size)),
+        # Almost-email without an @ sign
+        lambda: "a." * (size // 2) + "x",
+        # Runs of punctuation and capitals
+        lambda: "!?" * (size // 2),
+        lambda: " ".join("".join(rng.choice(string.ascii_uppercase) for _ in range(rng.randint(3, 8)))
+                         for _ in range(size // 6)),
+        # Many partial matches for the contextual patterns
+        lambda: "you are " * (size // 8),
+        lambda: "hate all those " * (size // 15),
+        # Unclosed tags
+        lambda: "<" * size,
+    ])()
+    return content, "".join(rng.choice(string.ascii_letters) for _ in range(rng.randint(5, 80)))
+
+
+CORPUS_BUILDERS: Dict[str, Callable[[random.Random], Tuple[str, str]]] = {
+    "short": _short_post,
+    "long": _long_post,
+    "html": _html_post,
+    "adversarial": _adversarial_post,
+}
+
+FUNCTIONS: Dict[str, Callable[[str, str], Any]] = {
+    # Bypass the result cache so every call does the full work
+    "check_content": lambda content, title: moderation.check_content(content, title, use_cache=False),
+    "check_content_fast_fail": lambda content, title: moderation.check_content(content, title, mode="fast_fail"),
+    "analyze_content_quality": lambda content, title: moderation.analyze_content_quality(content),
+    "analyze_sentiment": lambda content, title: moderation.analyze_sentiment(content),
+    "generate_improvement_suggestions": moderation.generate_improvement_suggestions,
+}
+
+
+def build_corpus(posts_per_category: int, seed: int = SEED) -> Dict[str, List[Tuple[str, str]]]:
+    """The same corpus for the same seed and size, on every machine."""
+    corpus = {}
+    for index, (category, builder) in enumerate(CORPUS_BUILDERS.items()):
+        rng = random.Random(seed + index)
+        corpus[category] = [builder(rng) for _ in range(posts_per_category)]
+    return corpus
+
+
+def _percentile(sorted_values: List[float], fraction: float) -> float:
+    index = min(len(sorted_values) - 1, max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def run(corpus: Dict[str, List[Tuple[str, str]]], repeat: int) -> Dict[str, Dict[str, Dict[str, float]]]:
+    """
+    Time every function on every corpus. Each post keeps its fastest time over
+    the passes and throughput comes from the fastest pass, which keeps the
+    numbers stable enough to compare between runs.
+    """
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for name, fn in FUNCTIONS.items():
+        results[name] = {}
+        for category, posts in corpus.items():
+            # Warm up compiled patterns and caches outside the measurement
+            fn(*posts[0])
+            random.seed(SEED)
+            best = [float("inf")] * len(posts)
+            best_pass = float("inf")
+            for _ in range(repeat):
+                pass_start = time.perf_counter()
+                for index, (content, title) in enumerate(posts):
+                    start = time.perf_counter()
+                    fn(content, title)
+                    best[index] = min(best[index], time.perf_counter() - start)
+                best_pass = min(best_pass, time.perf_counter() - pass_start)
+            best.sort()
+            results[name][category] = {
+                "posts": len(posts),
+                "posts_per_sec": len(posts) / best_pass if best_pass else 0.0,
+                "p50_ms": statistics.median(best) * 1000,
+                "p99_ms": _percentile(best, 0.99) * 1000,
+            }
+    return results
+
+
+def compare(results: Dict[str, Any], baseline: Dict[str, Any], tolerance: float, min_delta_ms: float) -> List[str]:
+    """
+    Describe every function/corpus pair that regressed beyond the tolerance.
+    Slowdowns smaller than `min_delta_ms` per post are timer noise and ignored.
+    """
+    regressions = []
+    for name, categories in results.items():
+        for category, current in categories.items():
+            previous = baseline.get(name, {}).get(category)
+            if not previous:
+                continue
+            if (current["p50_ms"] > previous["p50_ms"] * (1 + tolerance)
+                    and current["p50_ms"] - previous["p50_ms"] > min_delta_ms):
+                regressions.append(
+                    f"{name}/{category}: p50 {previous['p50_ms']:.3f} -> {current['p50_ms']:.3f} ms"
+                )
+            mean_delta_ms = 1000 / current["posts_per_sec"] - 1000 / previous["posts_per_sec"]
+            if (current["posts_per_sec"] < previous["posts_per_sec"] / (1 + tolerance)
+                    and mean_delta_ms > min_delta_ms):
+                regressions.append(
+                    f"{name}/{category}: throughput {previous['posts_per_sec']:.0f} -> "
+                    f"{current['posts_per_sec']:.0f} posts/sec"
+                )
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=40, help="posts per corpus category")
+    parser.add_argument("--repeat", type=int, default=5, help="passes over the corpus per function")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--output", default=None, help="write the JSON report here")
+    parser.add_argument("--save-baseline", default=None, help="write the results as a baseline file")
+    parser.add_argument("--baseline", default=None, help="compare against this baseline file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown, as a fraction")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05, help="ignore slowdowns below this per post")
+    args = parser.parse_args()
+
+    corpus = build_corpus(args.posts, args.seed)
+    results = run(corpus, args.repeat)
+    report = {"posts_per_category": args.posts, "repeat": args.repeat, "seed": args.seed, "results": results}
+
+    print(f"{'function':<34}{'corpus':<13}{'posts/sec':>11}{'p50 ms':>10}{'p99 ms':>10}")
+    for name, categories in results.items():
+        for category, result in categories.items():
+            print(f"{name:<34}{category:<13}{result['posts_per_sec']:>11.0f}"
+                  f"{result['p50_ms']:>10.3f}{result['p99_ms']:>10.3f}")
+
+    for path in filter(None, (args.output, args.save_baseline)):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nReport written to {path}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if (baseline.get("posts_per_category"), baseline.get("seed")) != (args.posts, args.seed):
+            print("\nWarning: baseline was recorded with a different corpus size or seed")
+        regressions = compare(results, baseline["results"], args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"\nRegressions beyond {args.tolerance:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print(f"\nNo regressions beyond {args.tolerance:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Seed N posts and record query plans and latency for the main read endpoints,
+with and without the post indexes, so index regressions show up in review.
+
+Usage (from the backend directory):
+    python benchmarks/query_plans.py --posts 50000 --output plans.json
+
+Runs against a throwaway SQLite file unless --database-url is given; the
+exported DATABASE_URL is ignored. The posts table of that database is
+emptied and reseeded, so --database-url also needs --destroy-data.
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+STATUSES = ["draft", "flagged", "approved", "published"]
+
+# Indexes added for the list, stats and dashboard workloads
+BENCHMARKED_INDEXES = (
+    "ix_posts_status_created_at",
+    "ix_posts_created_at_id",
+    "ix_posts_status_published_at",
+    "ix_posts_published_at_published",
+)
+
+
+def seed_posts(engine, models, count: int, batch_size: int = 5000) -> None:
+    """Replace the posts table contents with `count` synthetic posts."""
+    rng = random.Random(42)
+    now = datetime.now()
+    table = models.Post.__table__
+    with engine.begin() as conn:
+        conn.execute(table.delete())
+        for start in range(0, count, batch_size):
+            rows = []
+            for _ in range(start, min(count, start + batch_size)):
+                status = rng.choices(STATUSES, weights=[3, 1, 2, 4])[0]
+                created_at = now - timedelta(seconds=rng.randint(0, 365 * 24 * 3600))
+                rows.append({
+                    "title": f"Synthetic post {rng.randint(0, 10 ** 6)}",
+                    "content": "Lorem ipsum dolor sit amet. " * rng.randint(5, 60),
+                    "status": status,
+                    "created_at": created_at,
+                    "updated_at": created_at,
+                    "published_at": created_at + timedelta(hours=1) if status == "published" else None,
+                })
+            conn.execute(table.insert(), rows)
+
+
+def set_indexes(engine, models, enabled: bool) -> None:
+    for index in models.Post.__table__.indexes:
+        if index.name in BENCHMARKED_INDEXES:
+            if enabled:
+                index.create(engine, checkfirst=True)
+            else:
+                index.drop(engine, checkfirst=True)
+    with engine.begin() as conn:
+        conn.exec_driver_sql("ANALYZE")
+
+
+def capture_statements(engine):
+    """Record the SELECT statements run through the engine."""
+    from sqlalchemy import event
+
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    return statements, lambda: event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+def explain(engine, statement: str, parameters) -> list:
+    prefix = "EXPLAIN QUERY PLAN " if engine.dialect.name == "sqlite" else "EXPLAIN ANALYZE "
+    with engine.connect() as conn:
+        rows = conn.exec_driver_sql(prefix + statement, parameters).fetchall()
+    return [" | ".join(str(value) for value in row) for row in rows]
+
+
+def measure(client, engine, app_engine, endpoints, repeat: int) -> dict:
+    results = {}
+    for name, path in endpoints.items():
+        # The endpoints run on the async engine; plans are explained on the sync one
+        statements, stop = capture_statements(app_engine)
+        client.get(path)
+        stop()
+
+        latencies = []
+        for _ in range(repeat):
+            start = time.perf_counter()
+            response = client.get(path)
+            latencies.append((time.perf_counter() - start) * 1000)
+            response.raise_for_status()
+        latencies.sort()
+        results[name] = {
+            "path": path,
+            "p50_ms": statistics.median(latencies),
+            "p95_ms": latencies[int(len(latencies) * 0.95) - 1] if len(latencies) > 1 else latencies[0],
+            "queries": [
+                {"sql": " ".join(statement.split()), "plan": explain(engine, statement, parameters)}
+                for statement, parameters in statements
+            ],
+        }
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--posts", type=int, default=20000, help="number of posts to seed")
+    parser.add_argument("--repeat", type=int, default=50, help="requests per endpoint")
+    parser.add_argument("--database-url", default=None, help="benchmark this database instead of a throwaway SQLite file")
+    parser.add_argument("--destroy-data", action="store_true", help="confirm that --database-url may be emptied")
+    parser.add_argument("--output", default=None, help="write the JSON report here")
+    args = parser.parse_args()
+    if args.database_url and not args.destroy_data:
+        parser.error("--database-url deletes every post in that database; add --destroy-data to confirm")
+
+    database_url = args.database_url or "sqlite:///" + os.path.join(tempfile.mkdtemp(), "query_plans.db")
+    os.environ["DATABASE_URL"] = database_url
+    # Reads must hit the seeded database, not a replica from the environment
+    os.environ["DATABASE_REPLICA_URL"] = ""
+
+    from fastapi.testclient import TestClient
+    import database
+    import models
+    import main as app_main
+
+    models.Base.metadata.create_all(bind=database.engine)
+    print(f"Seeding {args.posts} posts into {database.engine.url.render_as_string(hide_password=True)}")
+    seed_posts(database.engine, models, args.posts)
+
+    endpoints = {
+        "list": "/posts/",
+        "list_published": "/posts/?status=published",
+        "list_drafts_oldest": "/posts/?status=draft&sort=created_at",
+        "stats": "/stats/",
+        "post": "/posts/1",
+    }
+
+    report = {"posts": args.posts, "dialect": database.engine.dialect.name, "runs": {}}
+    with TestClient(app_main.app) as client:
+        first_id = client.get("/posts/?limit=1").json()[0]["id"]
+        endpoints["post"] = f"/posts/{first_id}"
+        for label, enabled in (("without_indexes", False), ("with_indexes", True)):
+            set_indexes(database.engine, models, enabled)
+            report["runs"][label] = measure(
+                client, database.engine, database.async_read_engine.sync_engine, endpoints, args.repeat
+            )
+
+    for label, results in report["runs"].items():
+        print(f"\n== {label}")
+        for name, result in results.items():
+            print(f"{name:<20} p50 {result['p50_ms']:8.2f} ms   p95 {result['p95_ms']:8.2f} ms")
+            for query in result["queries"]:
+                for line in query["plan"]:
+                    print(f"    {line}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
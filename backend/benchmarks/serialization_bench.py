@@ -0,0 +1,141 @@
+"""
+Measure the serialization cost per post of a GET /posts/ page, comparing the
+old response_model path (Pydantic validation, jsonable_encoder, json.dumps)
+with the orjson path the endpoint now uses for the rows it loads.
+
+Usage (from the backend directory):
+    python benchmarks/serialization_bench.py --page-size 50 --output serialization.json
+
+Pages are built in memory from the same dicts crud.list_posts returns, with
+moderation_data taken from real check_content runs, so no database is needed.
+Each projection of the fields parameter is timed separately because the heavy
+content and moderation_data columns dominate the cost.
+"""
+import argparse
+import json
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+from starlette.responses import JSONResponse
+
+import crud
+import moderation
+import schemas
+from responses import ORJSONResponse
+from moderation_bench import build_corpus
+
+STATUSES = ["draft", "flagged", "approved", "published"]
+
+# Values of the fields parameter to benchmark
+PROJECTIONS = {
+    "summary": (),
+    "content": ("content",),
+    "content+moderation_data": ("content", "moderation_data"),
+}
+
+PAGE_ADAPTER = TypeAdapter(List[schemas.PostSummary])
+
+
+def build_page(page_size: int, fields: tuple, seed: int) -> List[Dict[str, Any]]:
+    """One page of list rows, shaped like crud.list_posts output for `fields`."""
+    rng = random.Random(seed)
+    corpus = build_corpus(max(1, page_size // 4), seed)
+    posts = [post for category in ("short", "long", "html", "adversarial") for post in corpus[category]]
+    now = datetime.now()
+    rows = []
+    for index in range(page_size):
+        content, title = posts[index % len(posts)]
+        result = moderation.check_content(content, title or "Untitled", use_cache=False)
+        created_at = now - timedelta(minutes=index)
+        status = rng.choice(STATUSES)
+        row = {
+            "id": index + 1,
+            "title": (title or "Untitled")[:100],
+            "tags": "python, performance",
+            "status": status,
+            "flagged_reasons": None if result["approved"] else ", ".join(result["reasons"]),
+            "quality_score": result.get("quality_score"),
+            "warnings": ", ".join(result["warnings"]) or None,
+            "created_at": created_at,
+            "updated_at": created_at,
+            "published_at": created_at if status == "published" else None,
+            "content": content,
+            "moderation_data": result,
+        }
+        rows.append({name: row[name] for name in crud.LIST_COLUMNS + fields})
+    return rows
+
+
+def response_model_path(rows: List[Dict[str, Any]]) -> bytes:
+    """What FastAPI did for response_model=List[PostSummary], response_model_exclude_unset=True."""
+    validated = PAGE_ADAPTER.validate_python(rows)
+    return JSONResponse(jsonable_encoder(validated, exclude_unset=True)).body
+
+
+def orjson_path(rows: List[Dict[str, Any]]) -> bytes:
+    """What read_posts does now: encode the loaded rows as they are."""
+    return ORJSONResponse(rows).body
+
+
+PATHS: Dict[str, Callable[[List[Dict[str, Any]]], bytes]] = {
+    "response_model": response_model_path,
+    "orjson": orjson_path,
+}
+
+
+def time_path(fn: Callable[[List[Dict[str, Any]]], bytes], rows: List[Dict[str, Any]], repeat: int) -> Dict[str, float]:
+    fn(rows)  # Warm up schema and encoder caches
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(rows)
+        timings.append(time.perf_counter() - start)
+    return {
+        "page_ms": statistics.median(timings) * 1000,
+        "per_post_us": statistics.median(timings) / len(rows) * 1e6,
+        "bytes": len(fn(rows)),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--page-size", type=int, default=50, help="posts per page, like the limit parameter")
+    parser.add_argument("--repeat", type=int, default=200, help="timed encodes per path and projection")
+    parser.add_argument("--seed", type=int, default=1234)
+    parser.add_argument("--output", default=None, help="write the JSON report here")
+    args = parser.parse_args()
+
+    results: Dict[str, Dict[str, Dict[str, float]]] = {}
+    for projection, fields in PROJECTIONS.items():
+        rows = build_page(args.page_size, fields, args.seed)
+        # Both paths must produce the same document
+        if json.loads(response_model_path(rows)) != orjson.loads(orjson_path(rows)):
+            print(f"Warning: the two paths encode the {projection} page differently")
+        results[projection] = {name: time_path(fn, rows, args.repeat) for name, fn in PATHS.items()}
+
+    print(f"{'fields':<26}{'path':<17}{'page ms':>10}{'us/post':>10}{'bytes':>10}")
+    for projection, paths in results.items():
+        for name, result in paths.items():
+            print(f"{projection:<26}{name:<17}{result['page_ms']:>10.3f}"
+                  f"{result['per_post_us']:>10.1f}{result['bytes']:>10}")
+        speedup = paths["response_model"]["per_post_us"] / paths["orjson"]["per_post_us"]
+        print(f"{'':<26}{'speedup':<17}{speedup:>9.1f}x")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"page_size": args.page_size, "repeat": args.repeat, "results": results}, f, indent=2)
+        print(f"\nReport written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
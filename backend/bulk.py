@@ -0,0 +1,162 @@
+import csv
+import io
+import json
+import zlib
+from datetime import date, datetime
+from typing import Any, AsyncIterator, Dict, List, Optional, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import crud
+import database
+import schemas
+import settings
+from moderation_executor import executor as moderation_executor, ModerationTimeout
+
+
+EXPORT_MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _ndjson_lines(rows: List[Any]) -> str:
+    return "".join(json.dumps(dict(row._mapping), default=_json_default) + "\n" for row in rows)
+
+
+def _csv_cell(value: Any) -> Any:
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (dict, list)):
+        return json.dumps(value)
+    return value
+
+
+def _csv_lines(rows: List[Any]) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows([_csv_cell(value) for value in row] for row in rows)
+    return buffer.getvalue()
+
+
+async def stream_export(stmt, fmt: str, compress: bool = False, batch_size: int = None) -> AsyncIterator[bytes]:
+    """
+    Yield the rows selected by `stmt` as NDJSON or CSV, one batch at a time,
+    optionally gzip-compressed on the fly. Rows come from a server-side cursor
+    so memory use does not grow with the size of the export.
+    """
+    batch_size = batch_size or settings.EXPORT_BATCH_SIZE
+    encode = _ndjson_lines if fmt == "ndjson" else _csv_lines
+    # wbits=31 writes a gzip header and trailer
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+
+    def emit(text: str) -> bytes:
+        data = text.encode("utf-8")
+        return compressor.compress(data) if compressor else data
+
+    # The response outlives the request's dependencies, so the stream owns its session
+    async with database.AsyncReadSessionLocal() as db:
+        result = await db.stream(stmt.execution_options(yield_per=batch_size))
+        if fmt == "csv":
+            yield emit(_csv_lines([crud.EXPORT_COLUMNS]))
+        async for rows in result.partitions():
+            chunk = emit(encode(rows))
+            if chunk:
+                yield chunk
+
+    if compressor:
+        yield compressor.flush()
+
+
+def export_headers(fmt: str, compress: bool) -> Dict[str, str]:
+    filename = f"posts.{fmt}" + (".gz" if compress else "")
+    return {"Content-Disposition": f'attachment; filename="{filename}"'}
+
+
+# Per-line errors listed in an import response; the failed count covers the rest
+MAX_REPORTED_ERRORS = 1000
+
+
+def _add_error(report: Dict[str, Any], line: int, error: str) -> None:
+    report["failed"] += 1
+    if len(report["errors"]) < MAX_REPORTED_ERRORS:
+        report["errors"].append({"line": line, "error": error})
+
+
+def _validation_message(exc: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in error['loc'])}: {error['msg']}" if error["loc"] else error["msg"]
+        for error in exc.errors()
+    )
+
+
+async def _lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, bytes]]:
+    """Numbered lines of a streamed body, without holding more than one chunk."""
+    number = 0
+    pending = b""
+    async for chunk in chunks:
+        pending += chunk
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            number += 1
+            yield number, line
+    if pending:
+        yield number + 1, pending
+
+
+async def _store_batch(
+    db: AsyncSession, batch: List[Tuple[int, schemas.PostCreate]], moderate: bool, report: Dict[str, Any]
+) -> None:
+    records = [record for _, record in batch]
+    try:
+        moderation_results: Optional[List[Dict[str, Any]]] = None
+        if moderate:
+            moderation_results = await moderation_executor.acheck_contents_batch(
+                [(record.content, record.title) for record in records]
+            )
+        await db.run_sync(crud.insert_posts, records, moderation_results)
+        await db.commit()
+    except (ModerationTimeout, SQLAlchemyError) as exc:
+        await db.rollback()
+        message = str(exc).splitlines()[0] if str(exc) else type(exc).__name__
+        for line, _ in batch:
+            _add_error(report, line, f"Batch not imported: {message}")
+        return
+    report["imported"] += len(records)
+
+
+async def import_ndjson(
+    chunks: AsyncIterator[bytes], db: AsyncSession, batch_size: int = None, moderate: bool = False
+) -> Dict[str, Any]:
+    """
+    Validate a streamed NDJSON body line by line against PostCreate and insert
+    the valid records in batches, each in its own transaction. Invalid lines
+    and failed batches are reported per line without stopping the import.
+    """
+    batch_size = batch_size or settings.IMPORT_BATCH_SIZE
+    report: Dict[str, Any] = {"imported": 0, "failed": 0, "errors": []}
+    batch: List[Tuple[int, schemas.PostCreate]] = []
+
+    async for number, line in _lines(chunks):
+        if not line.strip():
+            continue
+        try:
+            batch.append((number, schemas.PostCreate.model_validate_json(line)))
+        except ValidationError as exc:
+            _add_error(report, number, _validation_message(exc))
+            continue
+        if len(batch) >= batch_size:
+            await _store_batch(db, batch, moderate, report)
+            batch = []
+
+    if batch:
+        await _store_batch(db, batch, moderate, report)
+    return report
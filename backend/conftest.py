@@ -0,0 +1,25 @@
+import os
+import tempfile
+
+import pytest
+
+# Tests that import the app run against a throwaway SQLite database, never the
+# DATABASE_URL from .env; set before settings is first imported
+os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "test.db")
+os.environ["DATABASE_REPLICA_URL"] = ""
+os.environ["MODERATION_WORKERS"] = "0"
+os.environ["MODERATION_JOB_WORKERS"] = "0"
+
+import database
+import models
+import moderation
+
+
+@pytest.fixture
+def empty_database():
+    """Start from empty tables and an empty moderation result cache."""
+    models.Base.metadata.create_all(bind=database.engine)
+    with database.engine.begin() as conn:
+        for table in reversed(models.Base.metadata.sorted_tables):
+            conn.execute(table.delete())
+    moderation.result_cache.clear()
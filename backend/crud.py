@@ -0,0 +1,524 @@
+import base64
+import binascii
+import json
+import re
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import bindparam, column, delete, func, insert, literal, literal_column, select, table, tuple_, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+import models
+import settings
+
+
+POST_STATUSES = ("draft", "flagged", "approved", "published")
+
+
+def adjust_status_counts(db: Session, changes: Dict[str, int]) -> None:
+    """
+    Apply per-status deltas to the post_status_counts table in the caller's
+    transaction. Does nothing unless STATS_COUNTERS is enabled.
+    """
+    if not settings.STATS_COUNTERS:
+        return
+    deltas = [{"b_status": status, "delta": delta} for status, delta in changes.items() if delta]
+    if deltas:
+        table = models.PostStatusCount.__table__
+        db.execute(
+            update(table)
+            .where(table.c.status == bindparam("b_status"))
+            .values(count=table.c.count + bindparam("delta")),
+            deltas
+        )
+
+
+def count_posts_by_status(db: Session) -> Dict[str, int]:
+    """Count posts per status with a single GROUP BY query."""
+    rows = db.query(models.Post.status, func.count()).group_by(models.Post.status).all()
+    counts = dict.fromkeys(POST_STATUSES, 0)
+    counts.update({status: count for status, count in rows})
+    return counts
+
+
+def reconcile_status_counts(db: Session) -> Dict[str, int]:
+    """Reset post_status_counts from the posts table, fixing any drift."""
+    counts = count_posts_by_status(db)
+    table = models.PostStatusCount.__table__
+    db.execute(table.delete())
+    db.execute(table.insert(), [{"status": status, "count": count} for status, count in counts.items()])
+    db.commit()
+    return counts
+
+
+def post_stats(db: Session) -> Dict[str, int]:
+    """Post counts per status plus the total."""
+    if settings.STATS_COUNTERS:
+        counts = dict.fromkeys(POST_STATUSES, 0)
+        counts.update({row.status: row.count for row in db.query(models.PostStatusCount).all()})
+    else:
+        counts = count_posts_by_status(db)
+    return {"total": sum(counts.values()), **counts}
+
+
+def published_per_day(db: Session, days: int) -> List[Dict[str, Any]]:
+    """Posts published per day over the last `days` days, using the published_at index."""
+    since = datetime.now() - timedelta(days=days)
+    day = func.date(models.Post.published_at)
+    rows = (
+        db.query(day.label("day"), func.count().label("count"))
+        .filter(models.Post.status == "published", models.Post.published_at >= since)
+        .group_by(day)
+        .order_by(day)
+        .all()
+    )
+    return [{"date": row.day, "count": row.count} for row in rows]
+
+
+def moderation_values(
+    moderation_result: Dict[str, Any], paragraph_cache: Optional[Dict[str, Any]] = None
+) -> Dict[str, Any]:
+    """
+    Column values to store on a post after a moderation run, including the
+    paragraph cache of an incremental run when one is given.
+    """
+    approved = moderation_result["approved"]
+    warnings = moderation_result.get("warnings")
+    values = {
+        "status": "approved" if approved else "flagged",
+        "quality_score": moderation_result.get("quality_score", 0),
+        # Store full moderation data for advanced features
+        "moderation_data": moderation_result,
+        # Store warnings as comma-separated string
+        "warnings": ", ".join(warnings) if warnings else None,
+        "flagged_reasons": None if approved else ", ".join(moderation_result["reasons"]),
+    }
+    if paragraph_cache is not None:
+        values["moderation_paragraphs"] = paragraph_cache
+    return values
+
+
+def transition_post(
+    db: Session,
+    post_id: int,
+    expected: Tuple[str, ...],
+    values: Dict[str, Any],
+    version: Optional[int] = None,
+) -> Optional[models.Post]:
+    """
+    Apply `values` to the post in a single UPDATE ... RETURNING, but only if its
+    status is one of `expected` and, when `version` is given, the post has not
+    been written since that version was read. Returns the updated post, or None
+    when the post is missing, in another status or written meanwhile. The
+    caller commits.
+    """
+    stmt = update(models.Post).where(models.Post.id == post_id, models.Post.status.in_(expected))
+    if version is not None:
+        stmt = stmt.where(models.Post.version == version)
+    post = db.execute(
+        stmt.values(**values).returning(models.Post).execution_options(populate_existing=True)
+    ).scalar_one_or_none()
+    if post is not None and "status" in values and len(expected) == 1:
+        adjust_status_counts(db, {expected[0]: -1, values["status"]: 1})
+    return post
+
+
+def post_status(db: Session, post_id: int) -> Optional[str]:
+    """Current status of a post, or None if it does not exist."""
+    return db.execute(select(models.Post.status).where(models.Post.id == post_id)).scalar()
+
+
+MAX_TAG_LENGTH = 50
+
+
+def parse_tags(value: Optional[str]) -> List[str]:
+    """Split the comma-separated tag form into normalized, de-duplicated tag names."""
+    if not value:
+        return []
+    names = (name.strip().lower()[:MAX_TAG_LENGTH].strip() for name in value.split(","))
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def format_tags(names: List[str]) -> Optional[str]:
+    """Comma-separated form stored on posts.tags and returned by the API."""
+    return ", ".join(names) or None
+
+
+def _ensure_tags(db: Session, names: List[str]) -> Dict[str, int]:
+    """Ids of the named tags by name, creating the missing ones."""
+    table = models.Tag.__table__
+    dialect_insert = postgresql.insert if db.get_bind().dialect.name == "postgresql" else sqlite.insert
+    # ON CONFLICT keeps concurrent writers adding the same new tag from failing
+    db.execute(
+        dialect_insert(table).on_conflict_do_nothing(index_elements=["name"]),
+        [{"name": name, "post_count": 0} for name in names]
+    )
+    return dict(db.execute(select(table.c.name, table.c.id).where(table.c.name.in_(names))).all())
+
+
+def set_post_tags(db: Session, post_id: int, names: List[str]) -> None:
+    """
+    Make the post's post_tags rows match `names` and keep the tag usage counts
+    current. The caller commits.
+    """
+    current = dict(db.execute(
+        select(models.Tag.name, models.Tag.id)
+        .join(models.PostTag, models.PostTag.tag_id == models.Tag.id)
+        .where(models.PostTag.post_id == post_id)
+    ).all())
+    removed = [tag_id for name, tag_id in current.items() if name not in names]
+    added = [name for name in names if name not in current]
+
+    tag = models.Tag.__table__
+    if removed:
+        db.execute(delete(models.PostTag).where(models.PostTag.post_id == post_id, models.PostTag.tag_id.in_(removed)))
+        db.execute(update(tag).where(tag.c.id.in_(removed)).values(post_count=tag.c.post_count - 1))
+    if added:
+        tag_ids = list(_ensure_tags(db, added).values())
+        db.execute(insert(models.PostTag), [{"post_id": post_id, "tag_id": tag_id} for tag_id in tag_ids])
+        db.execute(update(tag).where(tag.c.id.in_(tag_ids)).values(post_count=tag.c.post_count + 1))
+
+
+def add_tags_to_new_posts(db: Session, post_tags: Dict[int, List[str]]) -> None:
+    """Tag many freshly inserted posts at once. The caller commits."""
+    names = list(dict.fromkeys(name for names in post_tags.values() for name in names))
+    if not names:
+        return
+    tag_ids = _ensure_tags(db, names)
+    db.execute(
+        insert(models.PostTag),
+        [{"post_id": post_id, "tag_id": tag_ids[name]} for post_id, names in post_tags.items() for name in names]
+    )
+    usage: Dict[int, int] = {}
+    for names in post_tags.values():
+        for name in names:
+            usage[tag_ids[name]] = usage.get(tag_ids[name], 0) + 1
+    tag = models.Tag.__table__
+    db.execute(
+        update(tag).where(tag.c.id == bindparam("b_id")).values(post_count=tag.c.post_count + bindparam("added")),
+        [{"b_id": tag_id, "added": added} for tag_id, added in usage.items()]
+    )
+
+
+def list_tags(db: Session, limit: int = 100) -> List[Dict[str, Any]]:
+    """Tags in use, most used first, with their stored post counts."""
+    rows = (
+        db.query(models.Tag.name, models.Tag.post_count)
+        .filter(models.Tag.post_count > 0)
+        .order_by(models.Tag.post_count.desc(), models.Tag.name)
+        .limit(limit)
+        .all()
+    )
+    return [{"name": row.name, "count": row.post_count} for row in rows]
+
+
+def _filter_by_tag(query, tag: str):
+    # Driven by the (tag_id, post_id) index on post_tags
+    return (
+        query.join(models.PostTag, models.PostTag.post_id == models.Post.id)
+        .join(models.Tag, models.Tag.id == models.PostTag.tag_id)
+        .filter(models.Tag.name == tag)
+    )
+
+
+# Columns loaded for every post in list responses
+LIST_COLUMNS = (
+    "id", "title", "tags", "status", "flagged_reasons", "quality_score",
+    "warnings", "created_at", "updated_at", "published_at",
+)
+
+# Heavy columns that list responses only load when asked for
+OPTIONAL_LIST_FIELDS = ("content", "moderation_data")
+
+
+def encode_cursor(created_at: datetime, post_id: int) -> str:
+    """Opaque keyset cursor pointing just past the given post."""
+    raw = json.dumps([created_at.isoformat(), post_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, int]:
+    """Inverse of encode_cursor; raises ValueError for malformed cursors."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, post_id = json.loads(raw)
+        return datetime.fromisoformat(created_at), int(post_id)
+    except (ValueError, TypeError, binascii.Error):
+        raise ValueError("Invalid cursor")
+
+
+def list_posts(
+    db: Session,
+    status: Optional[str] = None,
+    limit: int = 50,
+    cursor: Optional[str] = None,
+    descending: bool = True,
+    fields: Tuple[str, ...] = (),
+    tag: Optional[str] = None,
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Return one page of posts ordered by (created_at, id) and the cursor for
+    the next page (None on the last page). Only the list columns plus the
+    requested optional fields are loaded, along with each post's version for
+    the caller's validators.
+    """
+    post = models.Post
+    columns = [getattr(post, name) for name in LIST_COLUMNS + tuple(fields) + ("version",)]
+    query = db.query(*columns)
+    if status:
+        query = query.filter(post.status == status)
+    if tag:
+        query = _filter_by_tag(query, tag)
+
+    key = tuple_(post.created_at, post.id)
+    if cursor:
+        created_at, post_id = decode_cursor(cursor)
+        after = tuple_(literal(created_at, post.created_at.type), literal(post_id))
+        query = query.filter(key < after if descending else key > after)
+
+    if descending:
+        query = query.order_by(post.created_at.desc(), post.id.desc())
+    else:
+        query = query.order_by(post.created_at.asc(), post.id.asc())
+
+    # Fetch one extra row to learn whether there is a next page
+    rows = query.limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+    return [dict(row._mapping) for row in rows], next_cursor
+
+
+def post_version(db: Session, post_id: int) -> Optional[Any]:
+    """The post's id, version and updated_at, without loading its content."""
+    return db.execute(
+        select(models.Post.id, models.Post.version, models.Post.updated_at).where(models.Post.id == post_id)
+    ).first()
+
+
+# Columns returned with each search hit; content itself stays in the database
+SEARCH_COLUMNS = ("id", "title", "tags", "status", "created_at", "updated_at", "published_at")
+
+SNIPPET_START, SNIPPET_STOP = "<mark>", "</mark>"
+SNIPPET_ELLIPSIS = "..."
+
+# Content is HTML, so snippets carry its tags and may start or end inside one;
+# everything but the highlight marks is dropped before a snippet is returned
+# (a term highlighted inside an attribute puts marks inside the tag)
+_SNIPPET_TAG = re.compile(r"<(?!/?mark>)(?:[^<>]|</?mark>)*>")
+_SNIPPET_CUT_START = re.compile(r"^(?:[^<>]|</?mark>)*>")
+_SNIPPET_CUT_END = re.compile(r"<(?!/?mark>)(?:[^<>]|</?mark>)*$")
+
+
+def _clean_snippet(snippet: Optional[str]) -> Optional[str]:
+    """Remove the HTML tags of the content from a snippet, keeping its highlight marks."""
+    if not snippet:
+        return snippet
+    prefix = SNIPPET_ELLIPSIS if snippet.startswith(SNIPPET_ELLIPSIS) else ""
+    suffix = SNIPPET_ELLIPSIS if snippet.endswith(SNIPPET_ELLIPSIS) and len(snippet) > len(prefix) else ""
+    body = snippet[len(prefix):len(snippet) - len(suffix)]
+    if prefix:
+        body = _SNIPPET_CUT_START.sub("", body)
+    if suffix:
+        body = _SNIPPET_CUT_END.sub("", body)
+    # Tags often separate words, as between paragraphs
+    body = " ".join(_SNIPPET_TAG.sub(" ", body).split())
+    return prefix + body + suffix
+
+
+def search_posts(
+    db: Session,
+    q: str,
+    status: Optional[str] = None,
+    limit: int = 20,
+    offset: int = 0,
+) -> List[Dict[str, Any]]:
+    """
+    Rank posts matching the search query over title (highest weight), tags and
+    content. Each hit carries a highlighted snippet of the content instead of
+    the content itself.
+    """
+    post = models.Post
+    columns = [getattr(post, name) for name in SEARCH_COLUMNS]
+
+    if db.get_bind().dialect.name == "postgresql":
+        query = func.websearch_to_tsquery("english", q)
+        vector = literal_column("posts.search_vector")
+        rank = func.ts_rank_cd(vector, query)
+        page = select(post.id, rank.label("rank")).where(vector.op("@@")(query))
+        if status:
+            page = page.where(post.status == status)
+        page = page.order_by(rank.desc(), post.id).limit(limit).offset(offset).subquery()
+        # ts_headline re-parses the content, so only run it for the page of hits
+        snippet = func.ts_headline(
+            "english", post.content, query,
+            f"StartSel={SNIPPET_START}, StopSel={SNIPPET_STOP}, MaxFragments=2, MinWords=10, MaxWords=30"
+        )
+        stmt = (
+            select(*columns, page.c.rank, snippet.label("snippet"))
+            .join(page, page.c.id == post.id)
+            .order_by(page.c.rank.desc(), post.id)
+        )
+    else:
+        # FTS5 has its own query syntax; match the words as plain terms
+        terms = " ".join(f'"{term}"' for term in re.findall(r"\w+", q))
+        if not terms:
+            return []
+        fts = literal_column("posts_fts")
+        fts_table = table("posts_fts", column("rowid"))
+        # bm25 is lower-is-better; weights follow the FTS columns (title, content, tags)
+        rank = -func.bm25(fts, 10.0, 1.0, 4.0)
+        snippet = func.snippet(fts, 1, SNIPPET_START, SNIPPET_STOP, SNIPPET_ELLIPSIS, 24)
+        stmt = (
+            select(*columns, rank.label("rank"), snippet.label("snippet"))
+            .select_from(post)
+            .join(fts_table, fts_table.c.rowid == post.id)
+            .where(fts.op("MATCH")(terms))
+        )
+        if status:
+            stmt = stmt.where(post.status == status)
+        stmt = stmt.order_by(rank.desc(), post.id).limit(limit).offset(offset)
+
+    hits = [dict(row._mapping) for row in db.execute(stmt)]
+    for hit in hits:
+        hit["snippet"] = _clean_snippet(hit["snippet"])
+    return hits
+
+
+# Every stored column, in export order
+EXPORT_COLUMNS = (
+    "id", "title", "content", "tags", "status", "flagged_reasons", "quality_score",
+    "warnings", "moderation_data", "created_at", "updated_at", "published_at",
+)
+
+
+def export_posts_query(
+    status: Optional[str] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+):
+    """SELECT for a full export, in (created_at, id) order so the list indexes serve it."""
+    post = models.Post
+    stmt = select(*[getattr(post, name) for name in EXPORT_COLUMNS])
+    if status:
+        stmt = stmt.where(post.status == status)
+    if created_after:
+        stmt = stmt.where(post.created_at >= created_after)
+    if created_before:
+        stmt = stmt.where(post.created_at < created_before)
+    return stmt.order_by(post.created_at, post.id)
+
+
+def insert_posts(
+    db: Session, records: List[Any], moderation_results: Optional[List[Dict[str, Any]]] = None
+) -> List[int]:
+    """
+    Insert many posts with one executemany INSERT ... RETURNING and tag them.
+    Posts with a moderation result are stored approved or flagged, the rest as
+    drafts. Returns the new ids in record order. The caller commits.
+    """
+    rows = []
+    tags = []
+    for index, record in enumerate(records):
+        names = parse_tags(record.tags)
+        row = {"title": record.title, "content": record.content, "tags": format_tags(names), "status": "draft"}
+        if moderation_results is not None:
+            row.update(moderation_values(moderation_results[index]))
+        rows.append(row)
+        tags.append(names)
+    if not rows:
+        return []
+
+    post_ids = list(db.scalars(
+        insert(models.Post).returning(models.Post.id, sort_by_parameter_order=True), rows
+    ))
+    add_tags_to_new_posts(db, dict(zip(post_ids, tags)))
+
+    changes: Dict[str, int] = {}
+    for row in rows:
+        changes[row["status"]] = changes.get(row["status"], 0) + 1
+    adjust_status_counts(db, changes)
+    return post_ids
+
+
+def load_batch_drafts(db: Session, post_ids: List[int]) -> Tuple[Dict[int, Any], List[Any]]:
+    """
+    Load the columns moderation needs for every target post in one query.
+    Returns all found posts by id and the drafts among them, in request order.
+    """
+    rows = (
+        db.query(models.Post.id, models.Post.title, models.Post.content, models.Post.status, models.Post.version)
+        .filter(models.Post.id.in_(post_ids))
+        .all()
+    )
+    found = {row.id: row for row in rows}
+    drafts = [found[post_id] for post_id in post_ids if post_id in found and found[post_id].status == "draft"]
+    return found, drafts
+
+
+def store_batch_moderation(
+    db: Session, drafts: List[Any], moderation_results: List[Dict[str, Any]]
+) -> Dict[int, Dict[str, Any]]:
+    """
+    Write the moderation outcomes for a batch of drafts. Posts that left draft
+    or were edited meanwhile are skipped and left out of the returned outcomes,
+    so only rows actually updated are reported and counted. The caller commits.
+    """
+    if not drafts:
+        return {}
+    post = models.Post
+    # Lock the posts still at the version that was moderated; on Postgres nothing
+    # can change them before the caller commits, so exactly these get updated
+    eligible = set(db.execute(
+        select(post.id)
+        .where(tuple_(post.id, post.version).in_([(row.id, row.version) for row in drafts]), post.status == "draft")
+        .with_for_update()
+    ).scalars())
+
+    outcomes = {}
+    updates = []
+    for row, moderation_result in zip(drafts, moderation_results):
+        if row.id in eligible:
+            values = moderation_values(moderation_result)
+            outcomes[row.id] = values
+            updates.append({"b_id": row.id, "b_version": row.version, **values})
+    if not updates:
+        return outcomes
+
+    # One executemany UPDATE, still guarded in case the database does not lock rows
+    table = post.__table__
+    db.execute(
+        update(table)
+        .where(table.c.id == bindparam("b_id"), table.c.status == "draft", table.c.version == bindparam("b_version"))
+        .values({column: bindparam(column) for column in updates[0] if not column.startswith("b_")}),
+        updates
+    )
+    changes = {"draft": -len(outcomes)}
+    for values in outcomes.values():
+        changes[values["status"]] = changes.get(values["status"], 0) + 1
+    adjust_status_counts(db, changes)
+    return outcomes
+
+
+def batch_results(post_ids: List[int], found: Dict[int, Any], outcomes: Dict[int, Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """One result per requested id, in request order."""
+    results = []
+    for post_id in post_ids:
+        if post_id not in found:
+            results.append({"post_id": post_id, "error": "Post not found"})
+        elif found[post_id].status != "draft":
+            results.append({"post_id": post_id, "error": "Only draft posts can be submitted for review"})
+        elif post_id not in outcomes:
+            results.append({"post_id": post_id, "error": "Post changed during moderation, please submit again"})
+        else:
+            values = outcomes[post_id]
+            results.append({
+                "post_id": post_id,
+                "status": values["status"],
+                "quality_score": values["quality_score"],
+                "flagged_reasons": values["flagged_reasons"],
+                "warnings": values["warnings"],
+            })
+    return results
@@ -1,20 +1,152 @@
-import os
+import threading
+import time
+from typing import Any, Dict, Optional
+
 from sqlalchemy import create_engine
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-from dotenv import load_dotenv
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 
-# Load environment variables
-load_dotenv()
+import settings
 
 # Get PostgreSQL database URL from environment variable
-SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL")
+SQLALCHEMY_DATABASE_URL = settings.DATABASE_URL
+
+
+class PoolMetrics:
+    """Checkout wait times and saturation for one connection pool."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def record_wait(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_seconds_total += seconds
+            self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+
+class _InstrumentedPool:
+    """Records how long each checkout waited for a connection."""
+
+    def __init__(self, *args: Any, **kwargs: Any):
+        super().__init__(*args, **kwargs)
+        self.metrics = PoolMetrics()
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except Exception:
+            self.metrics.record_wait(time.perf_counter() - start, timed_out=True)
+            raise
+        self.metrics.record_wait(time.perf_counter() - start)
+        return connection
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.metrics = self.metrics
+        return pool
+
+
+class InstrumentedQueuePool(_InstrumentedPool, QueuePool):
+    """QueuePool that records checkout wait times."""
+
+
+class InstrumentedAsyncQueuePool(_InstrumentedPool, AsyncAdaptedQueuePool):
+    """Pool for async engines that records checkout wait times."""
+
+
+# Async drivers used in place of the configured sync driver
+ASYNC_DRIVERS = {"postgresql": "asyncpg", "sqlite": "aiosqlite"}
+
+
+def _engine_options(url: str, is_async: bool) -> Dict[str, Any]:
+    url_obj = make_url(url)
+    backend = url_obj.get_backend_name()
+    kwargs: Dict[str, Any] = {"pool_pre_ping": settings.DB_POOL_PRE_PING}
+
+    # In-memory SQLite keeps one connection per thread and has no pool to tune
+    if not (backend == "sqlite" and url_obj.database in (None, "", ":memory:")):
+        kwargs.update(
+            poolclass=InstrumentedAsyncQueuePool if is_async else InstrumentedQueuePool,
+            pool_size=settings.DB_POOL_SIZE,
+            max_overflow=settings.DB_MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+
+    if backend == "postgresql" and settings.DB_STATEMENT_TIMEOUT_MS > 0:
+        if is_async:
+            kwargs["connect_args"] = {"server_settings": {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}}
+        else:
+            kwargs["connect_args"] = {"options": f"-c statement_timeout={settings.DB_STATEMENT_TIMEOUT_MS}"}
+    return kwargs
+
+
+def create_db_engine(url: str) -> Engine:
+    """Create an engine with the pool settings from the environment."""
+    return create_engine(url, **_engine_options(url, is_async=False))
+
+
+def create_async_db_engine(url: str) -> AsyncEngine:
+    """Create an async engine for the same database, swapping in the async driver."""
+    url_obj = make_url(url)
+    driver = ASYNC_DRIVERS.get(url_obj.get_backend_name())
+    if driver:
+        url_obj = url_obj.set(drivername=f"{url_obj.get_backend_name()}+{driver}")
+    return create_async_engine(url_obj, **_engine_options(url, is_async=True))
+
+
+def pool_stats(engine: Any) -> Optional[Dict[str, Any]]:
+    """Current pool usage and checkout wait metrics, or None for unpooled engines."""
+    pool = engine.pool
+    if not isinstance(pool, _InstrumentedPool):
+        return None
+    metrics = pool.metrics
+    capacity = pool.size() + max(pool._max_overflow, 0)
+    checked_out = pool.checkedout()
+    return {
+        "size": pool.size(),
+        "max_overflow": pool._max_overflow,
+        "checked_out": checked_out,
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),
+        "saturation": checked_out / capacity if capacity else 0.0,
+        "checkouts": metrics.checkouts,
+        "checkout_timeouts": metrics.timeouts,
+        "checkout_wait_seconds_total": metrics.wait_seconds_total,
+        "checkout_wait_seconds_max": metrics.wait_seconds_max,
+    }
+
 
 # Create engine
-engine = create_engine(SQLALCHEMY_DATABASE_URL)
+engine = create_db_engine(SQLALCHEMY_DATABASE_URL)
+
+# Read-only traffic goes to the replica when one is configured
+read_engine = create_db_engine(settings.DATABASE_REPLICA_URL) if settings.DATABASE_REPLICA_URL else engine
 
-# Create session factory
+# Create session factories
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+
+# Async engines and sessions serve the API endpoints; the sync ones above are
+# used by background workers, scripts and migrations
+async_engine = create_async_db_engine(SQLALCHEMY_DATABASE_URL)
+async_read_engine = (
+    create_async_db_engine(settings.DATABASE_REPLICA_URL) if settings.DATABASE_REPLICA_URL else async_engine
+)
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
 
 # Create base class for ORM models
 Base = declarative_base()
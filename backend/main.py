@@ -1,26 +1,71 @@
-from fastapi import FastAPI, Depends, HTTPException, Query, Request
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from fastapi.responses import HTMLResponse
-from sqlalchemy.orm import Session
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from typing import List, Optional, Dict, Any
-from datetime import datetime
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+import asyncio
+import hashlib
+import json
 import os
 from pathlib import Path
+from contextlib import asynccontextmanager
 
 import models
 import schemas
 import database
 import moderation
+import crud
+import settings
+import moderation_jobs
+import bulk
+import metrics
+from moderation_executor import executor as moderation_executor, ModerationBusy, ModerationTimeout
+from responses import ORJSONResponse
 
 # Create tables
 models.Base.metadata.create_all(bind=database.engine)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Counters may have drifted while they were disabled or another build was running
+    if settings.STATS_COUNTERS:
+        db = database.SessionLocal()
+        try:
+            crud.reconcile_status_counts(db)
+        finally:
+            db.close()
+    # Start draining the moderation job queue
+    if moderation_jobs.workers.workers > 0:
+        moderation_jobs.workers.start()
+    yield
+    moderation_jobs.workers.stop()
+    # Stop moderation worker processes
+    moderation_executor.shutdown()
+    await database.async_engine.dispose()
+    if database.async_read_engine is not database.async_engine:
+        await database.async_read_engine.dispose()
+
+# Fields of schemas.Post, read straight off ORM rows the schema already trusts
+POST_RESPONSE_FIELDS = tuple(schemas.Post.model_fields)
+
+
+def _post_response(post: models.Post, headers: Optional[Dict[str, str]] = None) -> ORJSONResponse:
+    """Encode a post with orjson, skipping response_model revalidation."""
+    return ORJSONResponse({name: getattr(post, name) for name in POST_RESPONSE_FIELDS}, headers=headers)
+
+
 app = FastAPI(
     title="Content Publishing Platform",
     description="A platform for creating and publishing blog posts with AI moderation",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 # Add CORS middleware
@@ -30,8 +75,38 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "Last-Modified", "X-Next-Cursor", "Link"],
 )
 
+# Request counts, latency and in-flight gauges per route, served on /metrics
+app.add_middleware(metrics.MetricsMiddleware)
+
+# Time every database round trip
+metrics.instrument_engine(database.async_engine.sync_engine, "primary")
+if database.async_read_engine is not database.async_engine:
+    metrics.instrument_engine(database.async_read_engine.sync_engine, "replica")
+metrics.instrument_engine(database.engine, "workers")
+
+
+def _runtime_metrics():
+    """Pool and moderation cache figures, read when /metrics is scraped."""
+    engines = {"primary": database.async_engine, "replica": database.async_read_engine, "workers": database.engine}
+    pool_samples = []
+    for name, engine in engines.items():
+        if name == "replica" and engine is database.async_engine:
+            continue
+        pool_samples.extend(metrics.dict_samples("db_pool", database.pool_stats(engine), {"engine": name}))
+    return [
+        metrics.gauge_family("db_pool", "Connection pool usage and checkout wait totals.", pool_samples),
+        metrics.gauge_family(
+            "moderation_cache", "Moderation result cache counters.",
+            metrics.dict_samples("moderation_cache", moderation.result_cache.info(), {})
+        ),
+    ]
+
+
+metrics.registry.add_collector(_runtime_metrics)
+
 # Create directories for static files and templates if they don't exist
 # Use relative paths from where the script is running
 current_dir = Path(__file__).parent
@@ -48,171 +123,438 @@ app.mount("/static", StaticFiles(directory=static_dir), name="static")
 templates = Jinja2Templates(directory=templates_dir)
 
 # Dependency
-def get_db():
-    db = database.SessionLocal()
-    try:
+async def get_db():
+    async with database.AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+
+async def get_read_db():
+    """Session for read-only endpoints; uses the read replica when one is configured."""
+    async with database.AsyncReadSessionLocal() as db:
+        yield db
+
+
+def _etag(*parts: Any) -> str:
+    """Strong ETag derived from the values that identify a representation."""
+    digest = hashlib.sha256(json.dumps(parts, default=str).encode("utf-8")).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def _utc(value: datetime) -> datetime:
+    # SQLite hands back naive UTC timestamps
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def _validator_headers(etag: str, last_modified: Optional[datetime]) -> Dict[str, str]:
+    headers = {"ETag": etag}
+    if last_modified is not None:
+        headers["Last-Modified"] = format_datetime(_utc(last_modified), usegmt=True)
+    return headers
+
+
+def _is_conditional(request: Request) -> bool:
+    return "if-none-match" in request.headers or "if-modified-since" in request.headers
+
+
+def _not_modified(request: Request, etag: str, last_modified: Optional[datetime]) -> bool:
+    """Evaluate If-None-Match, or If-Modified-Since when no If-None-Match was sent."""
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+    
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+        # HTTP dates have one-second resolution
+        return _utc(last_modified).replace(microsecond=0) <= _utc(since)
+    return False
 
 
 @app.post("/posts/", response_model=schemas.Post)
-def create_post(post: schemas.PostCreate, db: Session = Depends(get_db)):
+async def create_post(post: schemas.PostCreate, db: AsyncSession = Depends(get_db)):
     """Create a new draft blog post."""
+    tags = crud.parse_tags(post.tags)
     db_post = models.Post(
         title=post.title,
         content=post.content,
+        tags=crud.format_tags(tags),
         status="draft"
     )
     db.add(db_post)
-    db.commit()
-    db.refresh(db_post)
-    return db_post
+    await db.flush()
+    await db.run_sync(crud.set_post_tags, db_post.id, tags)
+    await db.run_sync(crud.adjust_status_counts, {"draft": 1})
+    await db.commit()
+    await db.refresh(db_post)
+    return _post_response(db_post)
+
+
+@app.get("/posts/", response_model=List[schemas.PostSummary], response_model_exclude_unset=True)
+async def read_posts(
+    request: Request,
+    status: Optional[str] = Query(None, pattern="^(draft|flagged|approved|published)$"),
+    tag: Optional[str] = Query(None, max_length=crud.MAX_TAG_LENGTH),
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    sort: str = Query("-created_at", pattern="^-?created_at$"),
+    fields: Optional[str] = Query(None, description="Comma-separated extra fields: content, moderation_data"),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """
+    List posts with optional status filter, one page at a time.
+    The cursor for the next page is returned in the X-Next-Cursor and Link headers.
+    Rows are encoded as loaded; response_model only documents the shape.
+    """
+    extra_fields = tuple(field.strip() for field in fields.split(",") if field.strip()) if fields else ()
+    unknown = [field for field in extra_fields if field not in crud.OPTIONAL_LIST_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    
+    tag = tag.strip().lower() if tag else None
+    try:
+        posts, next_cursor = await db.run_sync(
+            crud.list_posts,
+            status=status,
+            limit=limit,
+            cursor=cursor,
+            descending=sort.startswith("-"),
+            fields=tuple(dict.fromkeys(extra_fields)),
+            tag=tag
+        )
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    
+    # The ETag covers the query and the version of every post on the page, so a
+    # 304 costs one page query rather than a scan of everything the filter matches
+    versions = [(post["id"], post.pop("version")) for post in posts]
+    last_modified = max((post["updated_at"] for post in posts if post["updated_at"]), default=None)
+    etag = _etag(sorted(request.query_params.multi_items()), versions, next_cursor)
+    headers = _validator_headers(etag, last_modified)
+    if _not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    if next_cursor:
+        headers["X-Next-Cursor"] = next_cursor
+        next_url = request.url.include_query_params(cursor=next_cursor)
+        headers["Link"] = f'<{next_url}>; rel="next"'
+    return ORJSONResponse(posts, headers=headers)
+
+
+@app.get("/posts/export", response_class=StreamingResponse)
+async def export_posts(
+    format: str = Query("ndjson", pattern="^(ndjson|csv)$"),
+    status: Optional[str] = Query(None, pattern="^(draft|flagged|approved|published)$"),
+    created_after: Optional[datetime] = Query(None, description="Only posts created at or after this time"),
+    created_before: Optional[datetime] = Query(None, description="Only posts created before this time"),
+    gzip: bool = Query(False, description="Compress the stream with gzip"),
+):
+    """Stream every matching post, with all columns, as NDJSON or CSV."""
+    stmt = crud.export_posts_query(status, created_after, created_before)
+    return StreamingResponse(
+        bulk.stream_export(stmt, format, compress=gzip),
+        media_type="application/gzip" if gzip else bulk.EXPORT_MEDIA_TYPES[format],
+        headers=bulk.export_headers(format, gzip)
+    )
 
 
-@app.get("/posts/", response_model=List[schemas.Post])
-def read_posts(
-    status: Optional[str] = Query(None, regex="^(draft|flagged|approved|published)$"),
-    db: Session = Depends(get_db)
+@app.post("/posts/import", response_model=schemas.ImportResult)
+async def import_posts(
+    request: Request,
+    batch_size: int = Query(settings.IMPORT_BATCH_SIZE, ge=1, le=5000),
+    moderate: bool = Query(False, description="Run moderation and store posts as approved or flagged"),
+    db: AsyncSession = Depends(get_db)
 ):
-    """List all posts with optional status filter."""
-    query = db.query(models.Post)
-    if status:
-        query = query.filter(models.Post.status == status)
-    return query.all()
+    """
+    Import posts from an NDJSON request body, one PostCreate object per line.
+    Lines that fail validation or storage are reported and skipped.
+    """
+    return await bulk.import_ndjson(request.stream(), db, batch_size, moderate)
+
+
+@app.get("/posts/search", response_model=List[schemas.PostSearchResult])
+async def search_posts(
+    q: str = Query(..., min_length=1, max_length=200),
+    status: Optional[str] = Query(None, pattern="^(draft|flagged|approved|published)$"),
+    limit: int = Query(20, ge=1, le=100),
+    offset: int = Query(0, ge=0, le=10000),
+    db: AsyncSession = Depends(get_read_db)
+):
+    """Search posts by title, tags and content, best matches first."""
+    return await db.run_sync(crud.search_posts, q, status=status, limit=limit, offset=offset)
 
 
 @app.get("/posts/{post_id}", response_model=schemas.Post)
-def read_post(post_id: int, db: Session = Depends(get_db)):
+async def read_post(
+    post_id: int,
+    request: Request,
+    db: AsyncSession = Depends(get_read_db)
+):
     """View a specific post by ID."""
-    post = db.query(models.Post).filter(models.Post.id == post_id).first()
+    if _is_conditional(request):
+        # Check the validators against id and version only, before loading the post
+        version = await db.run_sync(crud.post_version, post_id)
+        if version is None:
+            raise HTTPException(status_code=404, detail="Post not found")
+        etag = _etag(version.id, version.version, version.updated_at)
+        if _not_modified(request, etag, version.updated_at):
+            return Response(status_code=304, headers=_validator_headers(etag, version.updated_at))
+    
+    post = await db.get(models.Post, post_id)
     if post is None:
         raise HTTPException(status_code=404, detail="Post not found")
-    return post
+    return _post_response(post, _validator_headers(_etag(post.id, post.version, post.updated_at), post.updated_at))
+
 
+@app.post("/posts/submit-batch/", response_model=List[schemas.BatchSubmitResult])
+async def submit_posts_batch(batch: schemas.BatchSubmitRequest, db: AsyncSession = Depends(get_db)):
+    """Submit many draft posts for AI moderation review in one request."""
+    post_ids = list(dict.fromkeys(batch.post_ids))
+    found, drafts = await db.run_sync(crud.load_batch_drafts, post_ids)
+    # End the read transaction so the connection goes back to the pool while moderation runs
+    await db.commit()
+    
+    # Moderation runs off the event loop, between the load and the bulk update
+    items = [(row.content, row.title) for row in drafts]
+    try:
+        if batch.parallel:
+            moderation_results = await moderation_executor.acheck_contents_batch(items)
+        else:
+            with metrics.MODERATION_LATENCY.time("check_contents_batch"):
+                moderation_results = await asyncio.to_thread(moderation.check_contents_batch, items)
+    except ModerationTimeout:
+        raise HTTPException(status_code=503, detail="Moderation timed out, please try again")
+    
+    outcomes = await db.run_sync(crud.store_batch_moderation, drafts, moderation_results)
+    await db.commit()
+    return crud.batch_results(post_ids, found, outcomes)
 
-@app.post("/posts/{post_id}/submit/", response_model=schemas.Post)
-def submit_post_for_review(post_id: int, db: Session = Depends(get_db)):
-    """Submit the post for AI moderation review."""
-    post = db.query(models.Post).filter(models.Post.id == post_id).first()
+
+@app.post(
+    "/posts/{post_id}/submit/",
+    response_model=schemas.Post,
+    responses={202: {"model": schemas.ModerationJob, "description": "Moderation queued (mode=async)"}}
+)
+async def submit_post_for_review(
+    post_id: int,
+    mode: str = Query("sync", pattern="^(sync|async)$"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    Submit the post for AI moderation review.
+    With mode=async the post is queued and a moderation job is returned
+    immediately; poll /moderation-jobs/{job_id} for the outcome.
+    """
+    post = (await db.execute(
+        select(
+            models.Post.id, models.Post.title, models.Post.content, models.Post.status,
+            models.Post.moderation_paragraphs, models.Post.version
+        )
+        .where(models.Post.id == post_id)
+    )).first()
     if post is None:
         raise HTTPException(status_code=404, detail="Post not found")
     
     if post.status != "draft":
         raise HTTPException(status_code=400, detail="Only draft posts can be submitted for review")
     
-    # Run enhanced moderation checks
-    moderation_result = moderation.check_content(post.content, post.title)
+    if mode == "async":
+        job = await db.run_sync(moderation_jobs.enqueue, post.id)
+        await db.commit()
+        moderation_jobs.workers.notify()
+        return JSONResponse(
+            status_code=202,
+            content=jsonable_encoder(schemas.ModerationJob.model_validate(job))
+        )
     
-    # Store the quality score
-    post.quality_score = moderation_result.get("quality_score", 0)
+    # End the read transaction so the connection goes back to the pool while moderation runs
+    await db.commit()
     
-    # Store full moderation data for advanced features
-    post.moderation_data = moderation_result
-    
-    # Store warnings as comma-separated string
-    if moderation_result.get("warnings"):
-        post.warnings = ", ".join(moderation_result["warnings"])
-    
-    if moderation_result["approved"]:
-        post.status = "approved"
-        post.flagged_reasons = None
-    else:
-        post.status = "flagged"
-        post.flagged_reasons = ", ".join(moderation_result["reasons"])
+    # Run enhanced moderation checks in a worker process, rescanning only
+    # the paragraphs changed since the post was last moderated
+    try:
+        moderation_result, paragraph_cache = await moderation_executor.acheck_content_incremental(
+            post.content, post.title, post.moderation_paragraphs
+        )
+    except ModerationBusy:
+        raise HTTPException(status_code=503, detail="Moderation is busy, please try again", headers={"Retry-After": "1"})
+    except ModerationTimeout:
+        raise HTTPException(status_code=503, detail="Moderation timed out, please try again")
     
-    db.commit()
-    db.refresh(post)
-    return post
+    # Store status, quality score, warnings and full moderation data,
+    # provided the post is still the draft that was moderated
+    updated = await db.run_sync(
+        crud.transition_post, post_id, ("draft",),
+        crud.moderation_values(moderation_result, paragraph_cache), post.version
+    )
+    await db.commit()
+    if updated is None:
+        if await db.run_sync(crud.post_status, post_id) == "draft":
+            raise HTTPException(status_code=409, detail="Post was edited during moderation, please submit again")
+        await _raise_transition_error(db, post_id, "Only draft posts can be submitted for review")
+    return _post_response(updated)
 
 
 @app.patch("/posts/{post_id}/publish/", response_model=schemas.Post)
-def publish_post(post_id: int, db: Session = Depends(get_db)):
+async def publish_post(post_id: int, db: AsyncSession = Depends(get_db)):
     """Publish an approved post."""
-    post = db.query(models.Post).filter(models.Post.id == post_id).first()
-    if post is None:
-        raise HTTPException(status_code=404, detail="Post not found")
-    
-    if post.status != "approved":
-        raise HTTPException(status_code=400, detail="Only approved posts can be published")
-    
     # Update status and set published timestamp
-    post.status = "published"
-    post.published_at = datetime.now()
-    
-    db.commit()
-    db.refresh(post)
-    return post
+    post = await db.run_sync(
+        crud.transition_post, post_id, ("approved",), {"status": "published", "published_at": datetime.now()}
+    )
+    await db.commit()
+    if post is None:
+        await _raise_transition_error(db, post_id, "Only approved posts can be published")
+    return _post_response(post)
 
 
 @app.patch("/posts/{post_id}", response_model=schemas.Post)
-def update_post(post_id: int, post_update: schemas.PostUpdate, db: Session = Depends(get_db)):
+async def update_post(post_id: int, post_update: schemas.PostUpdate, db: AsyncSession = Depends(get_db)):
     """Update a draft or flagged post."""
-    db_post = db.query(models.Post).filter(models.Post.id == post_id).first()
-    if db_post is None:
-        raise HTTPException(status_code=404, detail="Post not found")
-    
-    if db_post.status == "published":
-        raise HTTPException(status_code=400, detail="Published posts cannot be edited")
-    
-    if db_post.status == "approved":
-        # If updating an approved post, set back to draft
-        db_post.status = "draft"
-    
     # Update post fields
-    if post_update.title is not None:
-        db_post.title = post_update.title
-    if post_update.content is not None:
-        db_post.content = post_update.content
+    values = post_update.model_dump(exclude_none=True)
     if post_update.tags is not None:
-        db_post.tags = post_update.tags
+        tags = crud.parse_tags(post_update.tags)
+        values["tags"] = crud.format_tags(tags)
     
-    # Clear any previous moderation data when content is updated
+    # Clear any previous moderation data when content is updated; the
+    # per-paragraph figures stay for the next submit to reuse
     if post_update.content is not None:
-        db_post.moderation_data = None
-        db_post.quality_score = None
-        db_post.warnings = None
-        db_post.flagged_reasons = None
+        values.update(moderation_data=None, quality_score=None, warnings=None, flagged_reasons=None)
     
-    db.commit()
-    db.refresh(db_post)
-    return db_post
+    # An empty update must not touch updated_at or the version
+    post = await db.run_sync(
+        crud.transition_post, post_id, ("draft", "flagged"),
+        values or {"updated_at": models.Post.updated_at, "version": models.Post.version}
+    )
+    if post is None:
+        # If updating an approved post, set back to draft
+        post = await db.run_sync(crud.transition_post, post_id, ("approved",), {**values, "status": "draft"})
+    if post is not None and post_update.tags is not None:
+        await db.run_sync(crud.set_post_tags, post_id, tags)
+    await db.commit()
+    if post is None:
+        await _raise_transition_error(db, post_id, "Published posts cannot be edited")
+    return _post_response(post)
+
+
+async def _raise_transition_error(db: AsyncSession, post_id: int, detail: str) -> None:
+    """Tell a missing post (404) from one in the wrong status (400) after a guarded UPDATE matched nothing."""
+    if await db.run_sync(crud.post_status, post_id) is None:
+        raise HTTPException(status_code=404, detail="Post not found")
+    raise HTTPException(status_code=400, detail=detail)
+
+
+@app.get("/tags/", response_model=List[schemas.TagCount])
+async def read_tags(limit: int = Query(100, ge=1, le=1000), db: AsyncSession = Depends(get_read_db)):
+    """List tags in use with the number of posts carrying each, most used first."""
+    return await db.run_sync(crud.list_tags, limit)
 
 
 @app.get("/stats/", response_model=schemas.PostStats)
-def get_post_stats(db: Session = Depends(get_db)):
+async def get_post_stats(
+    days: Optional[int] = Query(None, ge=1, le=366, description="Include posts published per day over this many days"),
+    db: AsyncSession = Depends(get_read_db)
+):
     """Get statistics about posts in the platform."""
-    total = db.query(models.Post).count()
-    draft = db.query(models.Post).filter(models.Post.status == "draft").count()
-    flagged = db.query(models.Post).filter(models.Post.status == "flagged").count()
-    approved = db.query(models.Post).filter(models.Post.status == "approved").count()
-    published = db.query(models.Post).filter(models.Post.status == "published").count()
-    
-    return {
-        "total": total,
-        "draft": draft,
-        "flagged": flagged,
-        "approved": approved,
-        "published": published
-    }
+    stats = await db.run_sync(crud.post_stats)
+    if days:
+        stats["published_per_day"] = await db.run_sync(crud.published_per_day, days)
+    return stats
+
+
+@app.post("/stats/reconcile/", response_model=schemas.PostStats)
+async def reconcile_post_stats(db: AsyncSession = Depends(get_db)):
+    """Recount posts per status and reset the stored counters to match."""
+    counts = await db.run_sync(crud.reconcile_status_counts)
+    return {"total": sum(counts.values()), **counts}
 
 
 @app.get("/posts/{post_id}/ai-suggestions/", response_model=Dict[str, List[str]])
-def get_ai_suggestions(post_id: int, db: Session = Depends(get_db)):
+async def get_ai_suggestions(post_id: int, db: AsyncSession = Depends(get_read_db)):
     """Get AI-powered suggestions for improving a post."""
-    post = db.query(models.Post).filter(models.Post.id == post_id).first()
+    post = await db.get(models.Post, post_id)
     if post is None:
         raise HTTPException(status_code=404, detail="Post not found")
     
-    # Generate suggestions if they don't exist yet
+    # Generate suggestions if they don't exist yet; the moderation result is
+    # cached, so asking again for the same content reuses this run
     if not post.moderation_data or "suggestions" not in post.moderation_data:
-        suggestions = moderation.generate_improvement_suggestions(post.content, post.title)
+        try:
+            suggestions = (await moderation_executor.acheck_content(post.content, post.title))["suggestions"]
+        except (ModerationBusy, ModerationTimeout):
+            raise HTTPException(status_code=503, detail="Moderation is busy, please try again", headers={"Retry-After": "1"})
     else:
         suggestions = post.moderation_data["suggestions"]
     
     return suggestions
 
 
+@app.get("/db/pool/", response_model=Dict[str, Optional[Dict[str, Any]]])
+def get_pool_stats():
+    """Get connection pool usage and checkout wait metrics."""
+    return {
+        "primary": database.pool_stats(database.async_engine),
+        "replica": (
+            database.pool_stats(database.async_read_engine)
+            if database.async_read_engine is not database.async_engine else None
+        ),
+        "workers": database.pool_stats(database.engine)
+    }
+
+
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def get_metrics():
+    """Request, moderation and database metrics in the Prometheus text format."""
+    return PlainTextResponse(metrics.registry.render(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.get("/moderation/cache/", response_model=schemas.ModerationCacheStats)
+def get_moderation_cache_stats():
+    """Get hit and miss counters for the moderation result cache."""
+    return moderation.result_cache.info()
+
+
+@app.get("/moderation/rules/", response_model=schemas.ModerationRuleSet)
+def get_moderation_rules():
+    """Get the version and size of the moderation rule set in effect."""
+    return moderation.current_rules().info()
+
+
+@app.post("/moderation/preflight/", response_model=schemas.ModerationCheckResult, response_model_exclude_none=True)
+async def preflight_content(
+    check: schemas.ModerationCheck,
+    with_analysis: bool = Query(False, description="Also return the quality and sentiment analysis and suggestions")
+):
+    """
+    Cheap moderation check for autosave linting and submission pre-flight.
+    Checks run cheapest first and stop at the first blocking reason.
+    Content over the length limit is read in pieces and comes back without the analysis.
+    """
+    content = check.content
+    if len(content) > moderation.MAX_CONTENT_LENGTH:
+        # Stop reading once the text is known to be too long instead of analysing all of it
+        size = moderation.STREAM_CHUNK_SIZE
+        pieces = (content[start:start + size] for start in range(0, len(content), size))
+        with metrics.MODERATION_LATENCY.time("fast_fail_stream"):
+            return await asyncio.to_thread(moderation.check_content_stream, pieces, check.title)
+    with metrics.MODERATION_LATENCY.time("fast_fail"):
+        return await asyncio.to_thread(
+            moderation.check_content, content, check.title, mode="fast_fail", with_analysis=with_analysis
+        )
+
+
+@app.get("/moderation-jobs/{job_id}", response_model=schemas.ModerationJob)
+async def read_moderation_job(job_id: int, db: AsyncSession = Depends(get_db)):
+    """Check the state of a queued moderation job."""
+    job = await db.get(models.ModerationJob, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Moderation job not found")
+    return job
+
+
 @app.get("/", response_class=HTMLResponse)
 def homepage(request: Request):
     """Homepage with content publishing platform interface."""
@@ -0,0 +1,24 @@
+"""Add a retry time to moderation jobs
+
+Revision ID: 9b2d6f4e8a31
+Revises: 4f8c2e6a9b17
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b2d6f4e8a31'
+down_revision = '4f8c2e6a9b17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('moderation_jobs', sa.Column('not_before', sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade():
+    op.drop_column('moderation_jobs', 'not_before')
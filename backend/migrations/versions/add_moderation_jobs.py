@@ -0,0 +1,43 @@
+"""Add moderation jobs table
+
+Revision ID: 8a1d3c7f2b64
+Revises: e5fc9baf8e12
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a1d3c7f2b64'
+down_revision = 'e5fc9baf8e12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Create moderation jobs table for the DB-backed moderation queue
+    op.create_table('moderation_jobs',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('post_id', sa.Integer(), nullable=False),
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('attempts', sa.Integer(), nullable=False),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+        sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+        sa.CheckConstraint("status IN ('pending', 'running', 'done', 'failed')"),
+        sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_moderation_jobs_id'), 'moderation_jobs', ['id'], unique=False)
+    op.create_index(op.f('ix_moderation_jobs_post_id'), 'moderation_jobs', ['post_id'], unique=False)
+    op.create_index('ix_moderation_jobs_status_id', 'moderation_jobs', ['status', 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_moderation_jobs_status_id', table_name='moderation_jobs')
+    op.drop_index(op.f('ix_moderation_jobs_post_id'), table_name='moderation_jobs')
+    op.drop_index(op.f('ix_moderation_jobs_id'), table_name='moderation_jobs')
+    op.drop_table('moderation_jobs')
@@ -0,0 +1,24 @@
+"""Add per-paragraph moderation figures to posts
+
+Revision ID: 4f8c2e6a9b17
+Revises: 7e3a9f5c1d48
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4f8c2e6a9b17'
+down_revision = '7e3a9f5c1d48'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('posts', sa.Column('moderation_paragraphs', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    op.drop_column('posts', 'moderation_paragraphs')
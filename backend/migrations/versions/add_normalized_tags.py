@@ -0,0 +1,76 @@
+"""Move post tags into normalized tags and post_tags tables
+
+Revision ID: 7e3a9f5c1d48
+Revises: 2d7f1e8c4b95
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7e3a9f5c1d48'
+down_revision = '2d7f1e8c4b95'
+branch_labels = None
+depends_on = None
+
+MAX_TAG_LENGTH = 50
+
+
+def _parse_tags(value):
+    # Same normalization as crud.parse_tags
+    names = (name.strip().lower()[:MAX_TAG_LENGTH].strip() for name in (value or '').split(','))
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def upgrade():
+    tags = op.create_table('tags',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('post_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+    )
+    op.create_index(op.f('ix_tags_id'), 'tags', ['id'], unique=False)
+    post_tags = op.create_table('post_tags',
+        sa.Column('post_id', sa.Integer(), nullable=False),
+        sa.Column('tag_id', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['post_id'], ['posts.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['tag_id'], ['tags.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('post_id', 'tag_id')
+    )
+    op.create_index('ix_post_tags_tag_id_post_id', 'post_tags', ['tag_id', 'post_id'], unique=False)
+
+    # Split the existing comma-separated strings
+    conn = op.get_bind()
+    posts = sa.table('posts', sa.column('id', sa.Integer), sa.column('tags', sa.String))
+    parsed = {
+        row.id: _parse_tags(row.tags)
+        for row in conn.execute(sa.select(posts.c.id, posts.c.tags).where(posts.c.tags.isnot(None)))
+    }
+    names = list(dict.fromkeys(name for post_tag_names in parsed.values() for name in post_tag_names))
+    counts = {name: 0 for name in names}
+    for post_tag_names in parsed.values():
+        for name in post_tag_names:
+            counts[name] += 1
+    if names:
+        op.bulk_insert(tags, [{'id': index, 'name': name, 'post_count': counts[name]}
+                              for index, name in enumerate(names, start=1)])
+        tag_ids = {name: index for index, name in enumerate(names, start=1)}
+        op.bulk_insert(post_tags, [{'post_id': post_id, 'tag_id': tag_ids[name]}
+                                   for post_id, post_tag_names in parsed.items() for name in post_tag_names])
+        if conn.dialect.name == 'postgresql':
+            # Explicit ids were inserted; move the sequence past them
+            op.execute("SELECT setval(pg_get_serial_sequence('tags', 'id'), (SELECT MAX(id) FROM tags))")
+
+    # Store the normalized form back on the posts
+    for post_id, post_tag_names in parsed.items():
+        conn.execute(posts.update().where(posts.c.id == post_id).values(tags=', '.join(post_tag_names) or None))
+
+
+def downgrade():
+    op.drop_index('ix_post_tags_tag_id_post_id', table_name='post_tags')
+    op.drop_table('post_tags')
+    op.drop_index(op.f('ix_tags_id'), table_name='tags')
+    op.drop_table('tags')
@@ -0,0 +1,39 @@
+"""Add composite indexes for post list, stats and dashboard queries
+
+Revision ID: 3c9e5a1b7d20
+Revises: 8a1d3c7f2b64
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c9e5a1b7d20'
+down_revision = '8a1d3c7f2b64'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Build indexes without locking writes on Postgres (CONCURRENTLY cannot run in a transaction)
+    with op.get_context().autocommit_block():
+        op.create_index('ix_posts_status_created_at', 'posts', ['status', 'created_at', 'id'], unique=False,
+                        postgresql_concurrently=True)
+        op.create_index('ix_posts_created_at_id', 'posts', ['created_at', 'id'], unique=False,
+                        postgresql_concurrently=True)
+        op.create_index('ix_posts_status_published_at', 'posts', ['status', 'published_at'], unique=False,
+                        postgresql_concurrently=True)
+        op.create_index('ix_posts_published_at_published', 'posts', ['published_at'], unique=False,
+                        postgresql_where=sa.text("status = 'published'"),
+                        sqlite_where=sa.text("status = 'published'"),
+                        postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_posts_published_at_published', table_name='posts', postgresql_concurrently=True)
+        op.drop_index('ix_posts_status_published_at', table_name='posts', postgresql_concurrently=True)
+        op.drop_index('ix_posts_created_at_id', table_name='posts', postgresql_concurrently=True)
+        op.drop_index('ix_posts_status_created_at', table_name='posts', postgresql_concurrently=True)
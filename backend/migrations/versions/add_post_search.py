@@ -0,0 +1,70 @@
+"""Add full-text search over post title, tags and content
+
+Revision ID: 2d7f1e8c4b95
+Revises: 9b4e7c2a5d31
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2d7f1e8c4b95'
+down_revision = '9b4e7c2a5d31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        # Generated column, so the vector stays current on every insert and update
+        op.execute("""
+            ALTER TABLE posts ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+                setweight(to_tsvector('english'::regconfig, coalesce(title, '')), 'A') ||
+                setweight(to_tsvector('english'::regconfig, coalesce(tags, '')), 'B') ||
+                setweight(to_tsvector('english'::regconfig, coalesce(content, '')), 'C')
+            ) STORED
+        """)
+        with op.get_context().autocommit_block():
+            op.execute("CREATE INDEX CONCURRENTLY ix_posts_search_vector ON posts USING gin (search_vector)")
+    elif dialect == 'sqlite':
+        op.execute("""
+            CREATE VIRTUAL TABLE posts_fts USING fts5(
+                title, content, tags, content='posts', content_rowid='id', tokenize='porter unicode61'
+            )
+        """)
+        op.execute("""
+            CREATE TRIGGER posts_fts_insert AFTER INSERT ON posts BEGIN
+                INSERT INTO posts_fts(rowid, title, content, tags) VALUES (new.id, new.title, new.content, new.tags);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER posts_fts_delete AFTER DELETE ON posts BEGIN
+                INSERT INTO posts_fts(posts_fts, rowid, title, content, tags)
+                VALUES ('delete', old.id, old.title, old.content, old.tags);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER posts_fts_update AFTER UPDATE OF title, content, tags ON posts BEGIN
+                INSERT INTO posts_fts(posts_fts, rowid, title, content, tags)
+                VALUES ('delete', old.id, old.title, old.content, old.tags);
+                INSERT INTO posts_fts(rowid, title, content, tags) VALUES (new.id, new.title, new.content, new.tags);
+            END
+        """)
+        # Index the existing posts
+        op.execute("INSERT INTO posts_fts(posts_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        with op.get_context().autocommit_block():
+            op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_posts_search_vector")
+        op.execute("ALTER TABLE posts DROP COLUMN search_vector")
+    elif dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS posts_fts_update")
+        op.execute("DROP TRIGGER IF EXISTS posts_fts_delete")
+        op.execute("DROP TRIGGER IF EXISTS posts_fts_insert")
+        op.execute("DROP TABLE IF EXISTS posts_fts")
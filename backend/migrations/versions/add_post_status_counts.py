@@ -0,0 +1,37 @@
+"""Add post status counters table
+
+Revision ID: 6f2b8d4e9a13
+Revises: 3c9e5a1b7d20
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6f2b8d4e9a13'
+down_revision = '3c9e5a1b7d20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Create counters table backing O(1) /stats/
+    op.create_table('post_status_counts',
+        sa.Column('status', sa.String(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('status')
+    )
+    
+    # Seed the counters from the existing posts
+    op.execute(
+        "INSERT INTO post_status_counts (status, count) "
+        "SELECT s.status, (SELECT COUNT(*) FROM posts WHERE posts.status = s.status) "
+        "FROM (SELECT 'draft' AS status UNION ALL SELECT 'flagged' "
+        "UNION ALL SELECT 'approved' UNION ALL SELECT 'published') AS s"
+    )
+
+
+def downgrade():
+    op.drop_table('post_status_counts')
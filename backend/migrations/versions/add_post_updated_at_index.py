@@ -0,0 +1,27 @@
+"""Add an index for list ETag watermarks
+
+Revision ID: 9b4e7c2a5d31
+Revises: 6f2b8d4e9a13
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9b4e7c2a5d31'
+down_revision = '6f2b8d4e9a13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.create_index('ix_posts_status_updated_at', 'posts', ['status', 'updated_at'], unique=False,
+                        postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_posts_status_updated_at', table_name='posts', postgresql_concurrently=True)
@@ -0,0 +1,24 @@
+"""Add a row version counter to posts
+
+Revision ID: 3c7a1e9d5f20
+Revises: 9b2d6f4e8a31
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c7a1e9d5f20'
+down_revision = '9b2d6f4e8a31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('posts', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    op.drop_column('posts', 'version')
@@ -0,0 +1,30 @@
+"""Drop the list ETag watermark index
+
+List ETags are now built from the page itself, so nothing reads posts by
+(status, updated_at) any more.
+
+Revision ID: 5e8b2d7c4a69
+Revises: 3c7a1e9d5f20
+Create Date: 2026-10-17 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e8b2d7c4a69'
+down_revision = '3c7a1e9d5f20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_posts_status_updated_at', table_name='posts', postgresql_concurrently=True)
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        op.create_index('ix_posts_status_updated_at', 'posts', ['status', 'updated_at'], unique=False,
+                        postgresql_concurrently=True)
@@ -1,11 +1,36 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, CheckConstraint, sql, Float, JSON
+from sqlalchemy import Column, Integer, String, Text, DateTime, CheckConstraint, sql, Float, JSON, ForeignKey, Index, text, DDL, event, literal_column
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.orm import deferred
 from sqlalchemy.sql import func
 from database import Base
 
+# SQLite stores CURRENT_TIMESTAMP defaults without fractional seconds. Bind
+# timestamps in the same text format so comparisons against them (keyset
+# cursors, conditional requests) line up.
+Timestamp = DateTime(timezone=True).with_variant(
+    sqlite.DATETIME(storage_format="%(year)04d-%(month)02d-%(day)02d %(hour)02d:%(minute)02d:%(second)02d"),
+    "sqlite"
+)
+
 class Post(Base):
     """Post model representing blog posts in the database."""
     
     __tablename__ = "posts"
+    __table_args__ = (
+        # Status-filtered lists and stats, ordered by creation time (with id as the keyset tie-breaker)
+        Index("ix_posts_status_created_at", "status", "created_at", "id"),
+        # Unfiltered lists paginated by (created_at, id)
+        Index("ix_posts_created_at_id", "created_at", "id"),
+        # Published posts ordered by publication time
+        Index("ix_posts_status_published_at", "status", "published_at"),
+        # Partial index covering only published posts
+        Index(
+            "ix_posts_published_at_published",
+            "published_at",
+            postgresql_where=text("status = 'published'"),
+            sqlite_where=text("status = 'published'")
+        ),
+    )
     
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String, nullable=False)
@@ -17,13 +42,129 @@ class Post(Base):
         default="draft"
     )
     flagged_reasons = Column(Text, nullable=True)
-    tags = Column(String, nullable=True)  # Comma-separated tags
+    tags = Column(String, nullable=True)  # Comma-separated tags, kept in sync with post_tags
     quality_score = Column(Float, nullable=True)  # Content quality score (0-100)
     moderation_data = Column(JSON, nullable=True)  # Store full moderation results
+    # Per-paragraph moderation figures reused when an edited post is resubmitted; only loaded on access
+    moderation_paragraphs = deferred(Column(JSON, nullable=True))
     warnings = Column(Text, nullable=True)  # Warnings from moderation
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
-    published_at = Column(DateTime(timezone=True), nullable=True)
+    created_at = Column(Timestamp, server_default=func.now())
+    updated_at = Column(Timestamp, server_default=func.now(), onupdate=func.now())
+    published_at = Column(Timestamp, nullable=True)
+    # Bumped by every UPDATE of the row. Unlike updated_at, which SQLite keeps in
+    # whole seconds, it tells apart two writes in the same second.
+    version = Column(Integer, nullable=False, default=1, server_default="1", onupdate=literal_column("version + 1"))
     
     def __repr__(self):
         return f"<Post(id={self.id}, title='{self.title}', status='{self.status}')>"
+
+
+# Full-text search index over title, tags and content. Postgres keeps a
+# weighted tsvector in a generated column with a GIN index; SQLite uses an
+# external-content FTS5 table kept in sync by triggers. Neither is mapped on
+# Post so that loading posts never pulls the index data.
+SEARCH_DDL = {
+    "postgresql": [
+        """
+        ALTER TABLE posts ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+            setweight(to_tsvector('english'::regconfig, coalesce(title, '')), 'A') ||
+            setweight(to_tsvector('english'::regconfig, coalesce(tags, '')), 'B') ||
+            setweight(to_tsvector('english'::regconfig, coalesce(content, '')), 'C')
+        ) STORED
+        """,
+        "CREATE INDEX ix_posts_search_vector ON posts USING gin (search_vector)",
+    ],
+    "sqlite": [
+        """
+        CREATE VIRTUAL TABLE posts_fts USING fts5(
+            title, content, tags, content='posts', content_rowid='id', tokenize='porter unicode61'
+        )
+        """,
+        """
+        CREATE TRIGGER posts_fts_insert AFTER INSERT ON posts BEGIN
+            INSERT INTO posts_fts(rowid, title, content, tags) VALUES (new.id, new.title, new.content, new.tags);
+        END
+        """,
+        """
+        CREATE TRIGGER posts_fts_delete AFTER DELETE ON posts BEGIN
+            INSERT INTO posts_fts(posts_fts, rowid, title, content, tags)
+            VALUES ('delete', old.id, old.title, old.content, old.tags);
+        END
+        """,
+        """
+        CREATE TRIGGER posts_fts_update AFTER UPDATE OF title, content, tags ON posts BEGIN
+            INSERT INTO posts_fts(posts_fts, rowid, title, content, tags)
+            VALUES ('delete', old.id, old.title, old.content, old.tags);
+            INSERT INTO posts_fts(rowid, title, content, tags) VALUES (new.id, new.title, new.content, new.tags);
+        END
+        """,
+    ],
+}
+
+for dialect, statements in SEARCH_DDL.items():
+    for statement in statements:
+        event.listen(Post.__table__, "after_create", DDL(statement).execute_if(dialect=dialect))
+
+
+class Tag(Base):
+    """Normalized tag with a running count of the posts that use it."""
+    
+    __tablename__ = "tags"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, nullable=False, unique=True)
+    post_count = Column(Integer, nullable=False, default=0)
+    
+    def __repr__(self):
+        return f"<Tag(id={self.id}, name='{self.name}', post_count={self.post_count})>"
+
+
+class PostTag(Base):
+    """Association between posts and tags."""
+    
+    __tablename__ = "post_tags"
+    __table_args__ = (
+        # Tag filters go from the tag to its posts
+        Index("ix_post_tags_tag_id_post_id", "tag_id", "post_id"),
+    )
+    
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), primary_key=True)
+    tag_id = Column(Integer, ForeignKey("tags.id", ondelete="CASCADE"), primary_key=True)
+
+
+class PostStatusCount(Base):
+    """Running count of posts per status, kept current by the status transitions."""
+    
+    __tablename__ = "post_status_counts"
+    
+    status = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class ModerationJob(Base):
+    """Queued moderation run for a post, drained by the background job workers."""
+    
+    __tablename__ = "moderation_jobs"
+    __table_args__ = (
+        # Workers claim the oldest pending job first
+        Index("ix_moderation_jobs_status_id", "status", "id"),
+    )
+    
+    id = Column(Integer, primary_key=True, index=True)
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), nullable=False, index=True)
+    status = Column(
+        String,
+        CheckConstraint("status IN ('pending', 'running', 'done', 'failed')"),
+        nullable=False,
+        default="pending"
+    )
+    attempts = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+    # A job put back after a busy or slow moderation pool is not claimed before this
+    not_before = Column(DateTime(timezone=True), nullable=True)
+    
+    def __repr__(self):
+        return f"<ModerationJob(id={self.id}, post_id={self.post_id}, status='{self.status}')>"
@@ -1,10 +1,24 @@
 import re
 import html
+import copy
+import hashlib
+import json
+import logging
+import threading
+from collections import OrderedDict
 import random
-from typing import Dict, List, Any, Tuple
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import cached_property
+from typing import Dict, List, Any, Tuple, Callable, Iterable, Iterator, Optional
 from datetime import datetime
 
-# Sample list of banned words (in a real scenario, this could be loaded from a file or a database)
+import settings
+
+logger = logging.getLogger(__name__)
+
+# Sample list of banned words (MODERATION_RULES_FILE can replace this and the other rule lists)
 BANNED_WORDS = [
     "profanity", "insult", "stupid", "idiot", "moron", "hate", 
     "dumb", "damn", "hell", "jerk", "ass", "crap", "shit",
@@ -74,52 +88,398 @@ CONTENT_IMPROVEMENT_SUGGESTIONS = [
     "Your content could be enhanced with additional evidence or statistics"
 ]
 
+_HTML_TAG = re.compile(r'<[^>]+>')
+
 def strip_html(text: str) -> str:
     """Remove HTML tags from content for cleaner analysis."""
     # First unescape any HTML entities
     text = html.unescape(text)
     # Then remove HTML tags
-    text = re.sub(r'<[^>]+>', '', text)
+    text = _HTML_TAG.sub('', text)
     return text
 
+def _fingerprint(value: Any) -> str:
+    """Short stable hash of a JSON-serializable value."""
+    return hashlib.sha256(json.dumps(value).encode("utf-8")).hexdigest()[:12]
+
+def _build_trie(terms: Iterable[str]) -> Dict[str, Any]:
+    """Character trie of the terms; the key "" marks the end of a term."""
+    trie: Dict[str, Any] = {}
+    for term in terms:
+        node = trie
+        for char in term:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    return trie
+
+def _contained_terms(term: str, trie: Dict[str, Any]) -> List[str]:
+    """The other terms of the trie that occur inside `term`."""
+    found = []
+    for start in range(len(term)):
+        node = trie
+        for end in range(start, len(term)):
+            node = node.get(term[end])
+            if node is None:
+                break
+            if "" in node and end - start + 1 < len(term):
+                found.append(term[start:end + 1])
+    return found
+
+def _trie_regex(terms: List[str]) -> str:
+    """
+    Build a regex alternation from a character trie of the terms.
+    Shared prefixes are matched once, so the cost per position depends on
+    the term length rather than on the number of terms.
+    """
+    trie = _build_trie(terms)
+
+    def to_regex(node: Dict[str, Any]) -> str:
+        branches = [re.escape(char) + to_regex(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        if "" in node:
+            # A shorter term ends here; the rest of the branch is optional
+            return f"(?:{body})?"
+        return body
+
+    return to_regex(trie)
+
+# Endings a term may carry and still match, so inflected forms ("idiots",
+# "hateful") are flagged as they were by the old substring scan
+TERM_SUFFIXES = ("s", "es", "d", "ed", "ing", "ful")
+
+class TermMatcher:
+    """
+    Compiled single-pass matcher for the banned word and phrase lists.
+    Terms match case-insensitively as whole words, optionally followed by
+    one of TERM_SUFFIXES.
+    """
+
+    def __init__(self, words: List[str], phrases: List[str]):
+        self.words = tuple(words)
+        self.phrases = tuple(phrases)
+        self.version = _fingerprint([self.words, self.phrases])
+
+        # Map each lowercased term back to its position and spelling in the source lists
+        self._word_index = {}
+        for index, word in enumerate(self.words):
+            self._word_index.setdefault(word.lower(), (index, word))
+        self._phrase_index = {}
+        for index, phrase in enumerate(self.phrases):
+            self._phrase_index.setdefault(phrase.lower(), (index, phrase))
+
+        terms = {term for term in list(self._word_index) + list(self._phrase_index) if term}
+        suffix_length = max(map(len, TERM_SUFFIXES))
+        self.max_length = max(map(len, terms), default=0) + suffix_length
+
+        # A match only reports the longest term starting at a position, so remember
+        # which other terms each term contains ("ass" and "dumb" in "dumbass")
+        trie = _build_trie(terms)
+        self._contained = {term: _contained_terms(term, trie) for term in terms}
+
+        # The lookahead makes matches zero-width so terms inside longer terms are still found
+        suffixes = "|".join(sorted(map(re.escape, TERM_SUFFIXES), key=len, reverse=True))
+        self.pattern = re.compile(
+            r"(?<!\w)(?=(" + _trie_regex(sorted(terms)) + r")(?:" + suffixes + r")?(?!\w))",
+            re.IGNORECASE
+        ) if terms else None
+
+    def find(self, text: str) -> Tuple[List[str], List[str]]:
+        """Return the banned words and phrases found in the text, in list order."""
+        return self.order(self.find_terms(text))
+
+    def find_terms(self, text: str) -> set:
+        """Return the lowercased terms found in the text."""
+        found = set()
+        if self.pattern is None:
+            return found
+        for match in self.pattern.finditer(text):
+            term = match.group(1).lower()
+            if term not in found:
+                found.add(term)
+                found.update(self._contained.get(term, ()))
+        return found
+
+    def order(self, found: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """Split lowercased terms into banned words and phrases, in list order, with their source spelling."""
+        words = sorted(self._word_index[t] for t in found if t in self._word_index)
+        phrases = sorted(self._phrase_index[t] for t in found if t in self._phrase_index)
+        return [word for _, word in words], [phrase for _, phrase in phrases]
+
+class ContentAnalysis:
+    """
+    A post parsed once into the views the moderation rules need.
+    Derived values are computed on first access and shared by every rule.
+    """
+
+    def __init__(self, content: str, title: str = "", rules: Optional["RuleSet"] = None):
+        self.content = content
+        self.title = title or ""
+        # Every rule reads the same snapshot, even if new rules are swapped in meanwhile
+        self.rules = rules or current_rules()
+        self.clean_text = strip_html(content)
+
+    @cached_property
+    def lower_text(self) -> str:
+        return self.clean_text.lower()
+
+    @cached_property
+    def tokens(self) -> List[str]:
+        """Whitespace-separated tokens, punctuation included."""
+        return self.clean_text.split()
+
+    @cached_property
+    def words(self) -> List[str]:
+        """Lowercased words without punctuation."""
+        return _WORD_PATTERN.findall(self.lower_text)
+
+    @cached_property
+    def sentences(self) -> List[str]:
+        return [s.strip() for s in _SENTENCE_SPLIT.split(self.clean_text) if s.strip()]
+
+    @cached_property
+    def paragraphs(self) -> List[str]:
+        return _PARAGRAPH_SPLIT.split(self.clean_text)
+
+    @cached_property
+    def paragraph_count(self) -> int:
+        return len(self.paragraphs)
+
+    @cached_property
+    def token_count(self) -> int:
+        return len(self.tokens)
+
+    @cached_property
+    def caps_token_count(self) -> int:
+        return sum(1 for token in self.tokens if token.isupper() and len(token) > 2)
+
+    @cached_property
+    def exclamation_count(self) -> int:
+        return self.clean_text.count('!')
+
+    @cached_property
+    def found_terms(self) -> Tuple[List[str], List[str]]:
+        """Banned words and inappropriate phrases, found in a single pass."""
+        return self.rules.terms.find(self.clean_text)
+
+    @cached_property
+    def has_suspicious_pattern(self) -> bool:
+        return any(pattern.search(self.clean_text) for pattern in self.rules.patterns.suspicious)
+
+    @cached_property
+    def contexts(self) -> List[str]:
+        """Contexts whose offensive-content patterns match, in CONTEXTUAL_PATTERNS order."""
+        return [
+            context for context, patterns in self.rules.patterns.contextual
+            if any(pattern.search(self.clean_text) for pattern in patterns)
+        ]
+
+    @cached_property
+    def quality(self) -> Dict[str, Any]:
+        return _analyze_quality(self)
+
+    @cached_property
+    def sentiment(self) -> Dict[str, Any]:
+        return _analyze_sentiment(self)
+
+_WORD_PATTERN = re.compile(r'\b\w+\b')
+_SENTENCE_SPLIT = re.compile(r'[.!?]+')
+_PARAGRAPH_SPLIT = re.compile(r'\n\s*\n')
+
+class CompiledPatterns:
+    """Precompiled SUSPICIOUS_PATTERNS and CONTEXTUAL_PATTERNS."""
+
+    def __init__(self, suspicious: List[str], contextual: Dict[str, List[str]]):
+        self.suspicious_source = tuple(suspicious)
+        self.contextual_source = tuple((context, tuple(patterns)) for context, patterns in contextual.items())
+        self.version = _fingerprint([self.suspicious_source, self.contextual_source])
+        self.suspicious = [re.compile(pattern) for pattern in suspicious]
+        self.contextual = [
+            (context, [re.compile(pattern, re.IGNORECASE) for pattern in patterns])
+            for context, patterns in contextual.items()
+        ]
+
+
+def _check_string_list(key: str, value: Any) -> List[str]:
+    """`value` itself if it is a list of strings; raises ValueError otherwise."""
+    if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+        raise ValueError(f"{key} must be a list of strings")
+    return value
+
+class RuleSet:
+    """
+    Immutable snapshot of the moderation rule lists, compiled once. The version
+    is a fingerprint of the lists, so every process that loads the same rules
+    agrees on it.
+    """
+
+    def __init__(
+        self,
+        banned_words: List[str],
+        phrases: List[str],
+        suspicious: List[str],
+        contextual: Dict[str, List[str]],
+        source: str = "built-in",
+    ):
+        self.terms = TermMatcher(banned_words, phrases)
+        self.patterns = CompiledPatterns(suspicious, contextual)
+        self.version = f"{self.terms.version}-{self.patterns.version}"
+        self.source = source
+        self.loaded_at = datetime.now()
+
+    @classmethod
+    def defaults(cls) -> "RuleSet":
+        """The rule set built from the module lists."""
+        return cls(BANNED_WORDS, INAPPROPRIATE_PHRASES, SUSPICIOUS_PATTERNS, CONTEXTUAL_PATTERNS)
+
+    @classmethod
+    def from_file(cls, path: str) -> "RuleSet":
+        """
+        Load a JSON rules file with any of the keys banned_words,
+        inappropriate_phrases, suspicious_patterns and contextual_patterns;
+        missing keys keep the built-in lists. Raises ValueError for a file that
+        is not valid JSON, has a key of the wrong shape or holds a pattern that
+        does not compile.
+        """
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError("Rules file must hold a JSON object")
+        contextual = data.get("contextual_patterns", CONTEXTUAL_PATTERNS)
+        if not isinstance(contextual, dict):
+            raise ValueError("contextual_patterns must map categories to lists of patterns")
+        for category, patterns in contextual.items():
+            _check_string_list(f"contextual_patterns.{category}", patterns)
+        try:
+            return cls(
+                _check_string_list("banned_words", data.get("banned_words", BANNED_WORDS)),
+                _check_string_list("inappropriate_phrases", data.get("inappropriate_phrases", INAPPROPRIATE_PHRASES)),
+                _check_string_list("suspicious_patterns", data.get("suspicious_patterns", SUSPICIOUS_PATTERNS)),
+                contextual,
+                source=path,
+            )
+        except re.error as exc:
+            raise ValueError(f"Invalid pattern in rules file: {exc}")
+
+    def info(self) -> Dict[str, Any]:
+        return {
+            "version": self.version,
+            "source": self.source,
+            "loaded_at": self.loaded_at.isoformat(),
+            "banned_words": len(self.terms.words),
+            "inappropriate_phrases": len(self.terms.phrases),
+            "suspicious_patterns": len(self.patterns.suspicious),
+            "contextual_patterns": sum(len(patterns) for _, patterns in self.patterns.contextual),
+        }
+
+class RuleStore:
+    """
+    Holds the rule set in effect and swaps in a new snapshot when the rules
+    file changes. Readers take the current snapshot without locking; at most
+    once per poll interval a reader checks the file and, if it changed, one
+    of them rebuilds the snapshot while the others carry on with the old one.
+    A file that fails to load leaves the previous rules in effect.
+    """
+
+    def __init__(self, path: Optional[str] = None, poll_interval: float = 5.0):
+        self.path = path
+        self.poll_interval = poll_interval
+        self._reload_lock = threading.Lock()
+        self._signature: Optional[Tuple[int, int]] = None
+        self._next_check = 0.0
+        self._snapshot = RuleSet.defaults()
+        if path:
+            self.reload()
+
+    def _file_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def current(self) -> RuleSet:
+        if self.path:
+            now = time.monotonic()
+            if now >= self._next_check:
+                self._next_check = now + self.poll_interval
+                if self._file_signature() != self._signature and self._reload_lock.acquire(blocking=False):
+                    try:
+                        self._load_file()
+                    finally:
+                        self._reload_lock.release()
+        return self._snapshot
+
+    def reload(self) -> RuleSet:
+        """Rebuild the snapshot from the rules file, or from the module lists when there is no file."""
+        with self._reload_lock:
+            if self.path:
+                self._load_file()
+            else:
+                self._snapshot = RuleSet.defaults()
+        return self._snapshot
+
+    def _load_file(self) -> None:
+        signature = self._file_signature()
+        try:
+            snapshot = RuleSet.from_file(self.path)
+        except Exception as exc:
+            # Whatever is wrong with the file, a bad edit must not take moderation down
+            logger.error("Keeping moderation rules %s, could not load %s: %s", self._snapshot.version, self.path, exc)
+        else:
+            # A single reference assignment, so readers see the old or the new snapshot
+            self._snapshot = snapshot
+            logger.info("Loaded moderation rules %s from %s", snapshot.version, self.path)
+        # Do not retry a broken file until it changes again
+        self._signature = signature
+
+rules = RuleStore(settings.MODERATION_RULES_FILE, settings.MODERATION_RULES_POLL_INTERVAL)
+
+def current_rules() -> RuleSet:
+    """The rule set in effect."""
+    return rules.current()
+
+def reload_rules() -> RuleSet:
+    """Rebuild the rule set now instead of waiting for the next file check."""
+    return rules.reload()
+
 def calculate_readability_score(text: str) -> float:
     """
     Calculate a simple readability score based on sentence and word length.
     Higher scores indicate more complex text.
     """
-    # Remove HTML tags
-    text = strip_html(text)
-    
-    # Split into sentences (simple approach)
-    sentences = re.split(r'[.!?]+', text)
-    sentences = [s.strip() for s in sentences if s.strip()]
-    
-    if not sentences:
+    return _readability(ContentAnalysis(text))
+
+def _readability(analysis: ContentAnalysis) -> float:
+    words = analysis.tokens
+    return _readability_from_counts(len(analysis.sentences), len(words), sum(len(word) for word in words))
+
+def _readability_from_counts(sentence_count: int, token_count: int, token_chars: int) -> float:
+    if not sentence_count:
         return 0
     
     # Calculate average sentence length
-    words = text.split()
-    avg_sentence_length = len(words) / len(sentences)
+    avg_sentence_length = token_count / sentence_count
     
     # Calculate average word length
-    if not words:
+    if not token_count:
         return 0
-    total_chars = sum(len(word) for word in words)
-    avg_word_length = total_chars / len(words)
+    avg_word_length = token_chars / token_count
     
     # Simple readability score (higher means more complex)
     return (avg_sentence_length * 0.6) + (avg_word_length * 0.4)
 
 def analyze_content_quality(text: str) -> Dict[str, Any]:
     """Analyze the content quality and provide metrics."""
-    # Remove HTML tags
-    text = strip_html(text)
-    
+    return ContentAnalysis(text).quality
+
+def _analyze_quality(analysis: ContentAnalysis) -> Dict[str, Any]:
     # Basic word statistics
-    words = [word.lower() for word in re.findall(r'\b\w+\b', text)]
-    total_words = len(words)
-    unique_words = len(set(words))
-    
+    words = analysis.words
+    return _quality_from_counts(len(words), len(set(words)), sum(len(word) for word in words), _readability(analysis))
+
+def _quality_from_counts(total_words: int, unique_words: int, word_chars: int, readability_score: float) -> Dict[str, Any]:
     if total_words == 0:
         return {
             "word_count": 0,
@@ -132,8 +492,7 @@ def analyze_content_quality(text: str) -> Dict[str, Any]:
     
     # Calculate metrics
     unique_ratio = unique_words / total_words
-    avg_word_length = sum(len(word) for word in words) / total_words
-    readability_score = calculate_readability_score(text)
+    avg_word_length = word_chars / total_words
     
     # Estimate reading time (average person reads ~200-250 words per minute)
     reading_time_minutes = max(1, round(total_words / 225))
@@ -152,18 +511,21 @@ def analyze_sentiment(text: str) -> Dict[str, Any]:
     Simple sentiment analysis.
     In a real system, this would use a proper NLP model.
     """
-    # Remove HTML tags
-    text = strip_html(text).lower()
+    return ContentAnalysis(text).sentiment
+
+def _analyze_sentiment(analysis: ContentAnalysis) -> Dict[str, Any]:
+    text = analysis.lower_text
     
     # Count negative sentiment words
     negative_count = sum(1 for word in NEGATIVE_SENTIMENT_WORDS if word in text)
-    
+    return _sentiment_from_counts(negative_count, analysis.token_count)
+
+def _sentiment_from_counts(negative_count: int, token_count: int) -> Dict[str, Any]:
     # Simple sentiment score (-1 to 1)
-    words = text.split()
-    if not words:
+    if not token_count:
         return {"sentiment_score": 0, "is_negative": False}
     
-    sentiment_score = 1.0 - (negative_count * 2 / len(words))
+    sentiment_score = 1.0 - (negative_count * 2 / token_count)
     sentiment_score = max(-1.0, min(1.0, sentiment_score))  # Clamp between -1 and 1
     
     return {
@@ -173,7 +535,11 @@ def analyze_sentiment(text: str) -> Dict[str, Any]:
 
 def generate_improvement_suggestions(content: str, title: str = "") -> Dict[str, List[str]]:
     """Generate AI suggestions to improve the content and title."""
+    return _suggestions(ContentAnalysis(content, title))
+
+def _suggestions(analysis: ContentAnalysis) -> Dict[str, List[str]]:
     suggestions = {"title": [], "content": []}
+    title = analysis.title
     
     # Title suggestions
     if title:
@@ -186,7 +552,7 @@ def generate_improvement_suggestions(content: str, title: str = "") -> Dict[str,
         suggestions["title"].append(random.choice(TITLE_IMPROVEMENT_SUGGESTIONS))
     
     # Content suggestions
-    quality = analyze_content_quality(content)
+    quality = analysis.quality
     
     if quality["word_count"] < 200:
         suggestions["content"].append("Your content is relatively short. Consider adding more details or examples.")
@@ -198,8 +564,7 @@ def generate_improvement_suggestions(content: str, title: str = "") -> Dict[str,
         suggestions["content"].append("Your content uses many short words. Consider incorporating more specific terminology.")
     
     # Structure suggestions
-    paragraphs = re.split(r'\n\s*\n', strip_html(content))
-    if len(paragraphs) < 3 and quality["word_count"] > 200:
+    if analysis.paragraph_count < 3 and quality["word_count"] > 200:
         suggestions["content"].append("Consider breaking your content into more paragraphs for better readability.")
     
     # Add a random content improvement suggestion
@@ -207,105 +572,594 @@ def generate_improvement_suggestions(content: str, title: str = "") -> Dict[str,
     
     return suggestions
 
-def check_content(content: str, title: str = "") -> Dict[str, Any]:
+# Moderation rules. Each rule reads the shared ContentAnalysis and appends to the
+# reasons (blocking) and warnings (non-blocking) lists. Rules run in order.
+
+def _rule_length(analysis: ContentAnalysis, reasons: List[str], warnings: List[str]) -> None:
+    length = len(analysis.clean_text)
+    if length < MIN_CONTENT_LENGTH:
+        reasons.append(f"Content too short (minimum {MIN_CONTENT_LENGTH} characters)")
+    elif length > MAX_CONTENT_LENGTH:
+        reasons.append(f"Content too long (maximum {MAX_CONTENT_LENGTH} characters)")
+
+def _rule_banned_terms(analysis: ContentAnalysis, reasons: List[str], warnings: List[str]) -> None:
+    banned_words_found, inappropriate_phrases_found = analysis.found_terms
+    if banned_words_found:
+        reasons.append(f"Banned words detected: {', '.join(banned_words_found)}")
+    if inappropriate_phrases_found:
+        reasons.append(f"Inappropriate phrases detected: {', '.join(inappropriate_phrases_found)}")
+
+def _rule_suspicious_patterns(analysis: ContentAnalysis, reasons: List[str], warnings: List[str]) -> None:
+    if analysis.has_suspicious_pattern:
+        warnings.append("Suspicious patterns detected in your content")
+
+def _rule_caps_tone(analysis: ContentAnalysis, reasons: List[str], warnings: List[str]) -> None:
+    token_count = analysis.token_count
+    if token_count:  # Prevent division by zero
+        caps_count = analysis.caps_token_count
+        if caps_count > 3 or (caps_count / token_count > 0.2 and token_count > 10):
+            reasons.append("Aggressive tone detected (excessive use of capital letters)")
+
+def _rule_exclamations(analysis: ContentAnalysis, reasons: List[str], warnings: List[str]) -> None:
+    if analysis.exclamation_count > 5:
+        warnings.append("Excessive exclamation marks detected")
+
+def _rule_title_caps(analysis: ContentAnalysis, reasons: List[str], warnings: List[str]) -> None:
+    title = analysis.title
+    if title and title.isupper() and len(title) > 5:
+        reasons.append("Aggressive tone in title (all capital letters)")
+
+def _rule_contextual_patterns(analysis: ContentAnalysis, reasons: List[str], warnings: List[str]) -> None:
+    for context in analysis.contexts:
+        reasons.append(f"Potential {context} content detected")
+
+def _rule_vocabulary(analysis: ContentAnalysis, reasons: List[str], warnings: List[str]) -> None:
+    quality = analysis.quality
+    if quality["unique_ratio"] < MIN_UNIQUE_WORDS_RATIO and quality["word_count"] > 100:
+        warnings.append("Low vocabulary diversity")
+
+def _rule_sentiment(analysis: ContentAnalysis, reasons: List[str], warnings: List[str]) -> None:
+    if analysis.sentiment["is_negative"]:
+        warnings.append("Predominantly negative tone detected")
+
+MODERATION_RULES: List[Tuple[str, Callable[[ContentAnalysis, List[str], List[str]], None]]] = [
+    ("length", _rule_length),
+    ("banned_terms", _rule_banned_terms),
+    ("suspicious_patterns", _rule_suspicious_patterns),
+    ("caps_tone", _rule_caps_tone),
+    ("exclamations", _rule_exclamations),
+    ("title_caps", _rule_title_caps),
+    ("contextual_patterns", _rule_contextual_patterns),
+    ("vocabulary", _rule_vocabulary),
+    ("sentiment", _rule_sentiment),
+]
+
+# Rules run by fast-fail checks, cheapest first; the vocabulary and sentiment
+# warnings need the full quality and sentiment analysis and only run on request
+FAST_FAIL_ORDER = (
+    "title_caps", "length", "exclamations", "caps_tone",
+    "banned_terms", "contextual_patterns", "suspicious_patterns",
+)
+ANALYSIS_RULES = ("vocabulary", "sentiment")
+
+MODERATION_MODES = ("full", "fast_fail")
+
+# Quality score factors as (input, value at which the factor is full, points).
+# Each contributes min(1, input / target) * points; scoring.py applies the same
+# table in bulk, which rescore.py uses on stored posts after it changes.
+QUALITY_SCORE_FACTORS = (
+    ("word_count", 500, 25),  # Word count factor
+    ("unique_ratio", 0.6, 25),  # Uniqueness factor
+    ("avg_word_length", 5, 25),  # Word complexity factor
+    ("sentiment", 1, 25),  # Sentiment factor, sentiment_score rescaled to 0-1
+)
+
+def quality_score_inputs(quality: Dict[str, Any], sentiment: Dict[str, Any]) -> Dict[str, float]:
+    """The QUALITY_SCORE_FACTORS inputs from a quality and a sentiment analysis."""
+    return {
+        "word_count": quality["word_count"],
+        "unique_ratio": quality["unique_ratio"],
+        "avg_word_length": quality["avg_word_length"],
+        "sentiment": (sentiment["sentiment_score"] + 1) / 2,
+    }
+
+def _quality_score(analysis: ContentAnalysis) -> float:
+    """Calculate the quality score (0-100)."""
+    quality = analysis.quality
+    if quality["word_count"] == 0:
+        return 0
+    inputs = quality_score_inputs(quality, analysis.sentiment)
+    return sum(min(1.0, inputs[name] / target) * points for name, target, points in QUALITY_SCORE_FACTORS)
+
+def rule_set_version() -> str:
+    """Identify the moderation rules currently in effect; changes whenever a rule list does."""
+    return current_rules().version
+
+class ModerationCache:
+    """
+    Size-bounded LRU cache of moderation results keyed by a hash of the
+    title, content and rule set version, so rule changes never serve stale results.
+    """
+
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(content: str, title: str = "", version: Optional[str] = None) -> str:
+        digest = hashlib.sha256()
+        for part in (version or rule_set_version(), title or "", content):
+            digest.update(part.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def get(self, content: str, title: str = "") -> Optional[Dict[str, Any]]:
+        """Return a copy of the cached result, or None."""
+        if self.maxsize <= 0:
+            return None
+        key = self.key(content, title)
+        with self._lock:
+            result = self._entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        result = copy.deepcopy(result)
+        result["moderation_timestamp"] = datetime.now().isoformat()
+        return result
+
+    def put(self, content: str, title: str, result: Dict[str, Any]) -> None:
+        """Cache a result under the rules it was produced with; results from other rule sets are dropped."""
+        if self.maxsize <= 0:
+            return
+        # The rules may have been reloaded while the check ran
+        version = result.get("rule_set_version")
+        if version != rule_set_version():
+            return
+        key = self.key(content, title, version)
+        result = copy.deepcopy(result)
+        with self._lock:
+            self._entries[key] = result
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def info(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "maxsize": self.maxsize,
+            }
+
+result_cache = ModerationCache(settings.MODERATION_CACHE_SIZE)
+
+def check_content(
+    content: str,
+    title: str = "",
+    profile: bool = False,
+    use_cache: bool = True,
+    mode: str = "full",
+    with_analysis: bool = False,
+) -> Dict[str, Any]:
     """
     Enhanced AI moderation by checking content against advanced rules.
     
     Args:
         content: The post content to check
         title: The post title (optional for additional checks)
+        profile: Include a per-rule timing breakdown (in milliseconds) under
+            'rule_timings' for debugging; profiled runs bypass the cache
+        use_cache: Reuse the result of an earlier check of the same title
+            and content under the same rules
+        mode: 'full' runs every rule; 'fast_fail' runs the cheap rules first
+            and stops at the first blocking reason, for pre-flight checks
+        with_analysis: In fast_fail mode, also run the quality and sentiment
+            analysis and include it with the suggestions
         
     Returns:
         A dict with 'approved' flag, list of 'reasons' if not approved,
-        and additional metadata including quality analysis and suggestions
+        and additional metadata including quality analysis and suggestions.
+        Fast-fail results carry 'mode' and only hold the analysis when asked.
     """
-    # Remove HTML tags for analysis
-    clean_content = strip_html(content)
+    if mode not in MODERATION_MODES:
+        raise ValueError(f"Unknown moderation mode: {mode}")
+    # Fast-fail results are partial, so they never go through the cache
+    use_cache = use_cache and not profile and mode == "full"
+    if use_cache:
+        cached = result_cache.get(content, title)
+        if cached is not None:
+            return cached
+    
+    timings = {} if profile else None
+    clock = time.perf_counter
     
+    start = clock()
+    analysis = ContentAnalysis(content, title)
+    if profile:
+        timings["parse"] = (clock() - start) * 1000
+    
+    if mode == "fast_fail":
+        result = _moderate_fast_fail(analysis, with_analysis, timings)
+    else:
+        result = _moderate(analysis, timings)
+    if profile:
+        result["rule_timings"] = timings
+    if use_cache:
+        result_cache.put(content, title, result)
+    return result
+
+def _run_rules(
+    analysis: ContentAnalysis,
+    rules: Iterable[Tuple[str, Callable[[ContentAnalysis, List[str], List[str]], None]]],
+    reasons: List[str],
+    warnings: List[str],
+    timings: Optional[Dict[str, float]] = None,
+    stop_on_reason: bool = False,
+) -> None:
+    clock = time.perf_counter
+    for name, rule in rules:
+        if timings is not None:
+            start = clock()
+            rule(analysis, reasons, warnings)
+            timings[name] = (clock() - start) * 1000
+        else:
+            rule(analysis, reasons, warnings)
+        if stop_on_reason and reasons:
+            return
+
+def _moderate(analysis: ContentAnalysis, timings: Optional[Dict[str, float]] = None) -> Dict[str, Any]:
+    """Run the moderation rules over an analysis and build the result, timing each step into `timings` if given."""
+    clock = time.perf_counter
     reasons = []
     warnings = []
-    quality_score = 0
+    _run_rules(analysis, MODERATION_RULES, reasons, warnings, timings)
     
-    # Check content length
-    if len(clean_content) < MIN_CONTENT_LENGTH:
-        reasons.append(f"Content too short (minimum {MIN_CONTENT_LENGTH} characters)")
-    elif len(clean_content) > MAX_CONTENT_LENGTH:
-        reasons.append(f"Content too long (maximum {MAX_CONTENT_LENGTH} characters)")
+    start = clock()
+    quality_score = _quality_score(analysis)
+    suggestions = _suggestions(analysis)
+    if timings is not None:
+        timings["score_and_suggestions"] = (clock() - start) * 1000
     
-    # Check for banned words
-    banned_words_found = [word for word in BANNED_WORDS if word.lower() in clean_content.lower()]
-    if banned_words_found:
-        reasons.append(f"Banned words detected: {', '.join(banned_words_found)}")
-    
-    # Check for inappropriate phrases
-    inappropriate_phrases_found = [phrase for phrase in INAPPROPRIATE_PHRASES if phrase.lower() in clean_content.lower()]
-    if inappropriate_phrases_found:
-        reasons.append(f"Inappropriate phrases detected: {', '.join(inappropriate_phrases_found)}")
+    # Final result
+    return {
+        "approved": len(reasons) == 0,
+        "reasons": reasons,
+        "warnings": warnings,
+        "quality_score": quality_score,
+        "quality_analysis": analysis.quality,
+        "sentiment_analysis": analysis.sentiment,
+        "suggestions": suggestions,
+        "rule_set_version": analysis.rules.version,
+        "moderation_timestamp": datetime.now().isoformat()
+    }
+
+def _moderate_fast_fail(
+    analysis: ContentAnalysis, with_analysis: bool = False, timings: Optional[Dict[str, float]] = None
+) -> Dict[str, Any]:
+    """Run the rules cheapest first, stopping at the first blocking reason."""
+    rules = dict(MODERATION_RULES)
+    reasons = []
+    warnings = []
+    _run_rules(analysis, [(name, rules[name]) for name in FAST_FAIL_ORDER], reasons, warnings, timings, stop_on_reason=True)
     
-    # Check for suspicious patterns
-    pattern_matches = []
-    for pattern in SUSPICIOUS_PATTERNS:
-        if re.search(pattern, clean_content):
-            pattern_matches.append(pattern)
+    result = {
+        "approved": len(reasons) == 0,
+        "reasons": reasons,
+        "warnings": warnings,
+        "mode": "fast_fail",
+        "rule_set_version": analysis.rules.version,
+    }
+    if with_analysis:
+        _run_rules(analysis, [(name, rules[name]) for name in ANALYSIS_RULES], reasons, warnings, timings)
+        clock = time.perf_counter
+        start = clock()
+        result.update(
+            quality_score=_quality_score(analysis),
+            quality_analysis=analysis.quality,
+            sentiment_analysis=analysis.sentiment,
+            suggestions=_suggestions(analysis),
+        )
+        if timings is not None:
+            timings["score_and_suggestions"] = (clock() - start) * 1000
+    result["moderation_timestamp"] = datetime.now().isoformat()
+    return result
+
+# Streaming fast-fail checks for very long content. The content arrives in
+# pieces and is cleaned as it goes, holding back any entity or tag that may
+# continue in the next piece. The clean text is scanned in chunks cut at
+# whitespace; each chunk is scanned together with the end of the previous one
+# so terms and contextual patterns that span the cut are still found.
+
+STREAM_CHUNK_SIZE = 4096
+STREAM_OVERLAP = 256
+
+_WHITESPACE = re.compile(r"\s")
+_MAX_ENTITY_LENGTH = 32
+
+def _clean_pieces(pieces: Iterable[str]) -> Iterator[str]:
+    """strip_html over text arriving in pieces; the cleaned pieces join up to strip_html of the whole text."""
+    raw = ""
+    decoded = ""
+    for piece in pieces:
+        raw += piece
+        # An entity near the end may not be complete yet
+        cut = len(raw)
+        amp = raw.rfind("&", max(0, len(raw) - _MAX_ENTITY_LENGTH))
+        if amp != -1 and ";" not in raw[amp:]:
+            cut = amp
+        decoded += html.unescape(raw[:cut])
+        raw = raw[cut:]
+        # Nor a tag opened after the last '>'
+        tag_start = decoded.find("<", decoded.rfind(">") + 1)
+        if tag_start == -1:
+            tag_start = len(decoded)
+        yield _HTML_TAG.sub("", decoded[:tag_start])
+        decoded = decoded[tag_start:]
+    yield _HTML_TAG.sub("", decoded + html.unescape(raw))
+
+def check_content_stream(
+    pieces: Iterable[str],
+    title: str = "",
+    chunk_size: int = STREAM_CHUNK_SIZE,
+    overlap: int = STREAM_OVERLAP,
+) -> Dict[str, Any]:
+    """
+    Fast-fail check of content read in pieces, without joining it first.
+    Reading stops at the first blocking reason, including as soon as the
+    content is known to be too long.
     
-    if pattern_matches:
-        warnings.append("Suspicious patterns detected in your content")
+    Args:
+        pieces: The post content, in order, e.g. the chunks of an upload
+        title: The post title
+        chunk_size: Characters of clean text scanned at a time
+        overlap: Characters of the previous chunk scanned again with the next;
+            matches spanning a cut must fit in it
+        
+    Returns:
+        A fast_fail check_content result, without the quality analysis
+    """
+    rule_set = current_rules()
+    matcher = rule_set.terms
+    compiled = rule_set.patterns
+    overlap = max(overlap, matcher.max_length)
+    reasons: List[str] = []
+    warnings: List[str] = []
+    terms = set()
+    contexts = set()
+    counts = {"length": 0, "tokens": 0, "caps": 0, "exclamations": 0}
+    suspicious = False
+    tail = ""
     
-    # Check for aggressive tone (all caps)
-    words = clean_content.split()
-    if words:  # Prevent division by zero
-        all_caps_words = [word for word in words if word.isupper() and len(word) > 2]
-        if len(all_caps_words) > 3 or (len(all_caps_words) / len(words) > 0.2 and len(words) > 10):
-            reasons.append("Aggressive tone detected (excessive use of capital letters)")
+    def scan(segment: str) -> None:
+        nonlocal tail, suspicious
+        window = tail + segment
+        terms.update(matcher.find_terms(window))
+        contexts.update(
+            context for context, patterns in compiled.contextual
+            if context not in contexts and any(pattern.search(window) for pattern in patterns)
+        )
+        suspicious = suspicious or any(pattern.search(window) for pattern in compiled.suspicious)
+        tokens = segment.split()
+        counts["tokens"] += len(tokens)
+        counts["caps"] += sum(1 for token in tokens if token.isupper() and len(token) > 2)
+        counts["exclamations"] += segment.count("!")
+        # Start the overlap after a whitespace so it never begins mid-word
+        start = len(window) - overlap
+        if start > 0:
+            boundary = _WHITESPACE.search(window, start)
+            tail = window[boundary.end():] if boundary else ""
+        else:
+            tail = window
     
-    # Check for aggressive punctuation
-    if clean_content.count('!') > 5:
-        warnings.append("Excessive exclamation marks detected")
+    def blocking() -> List[str]:
+        found_words, found_phrases = matcher.order(terms)
+        blocked = []
+        if found_words:
+            blocked.append(f"Banned words detected: {', '.join(found_words)}")
+        if found_phrases:
+            blocked.append(f"Inappropriate phrases detected: {', '.join(found_phrases)}")
+        blocked.extend(
+            f"Potential {context} content detected" for context, _ in compiled.contextual if context in contexts
+        )
+        if counts["caps"] > 3:
+            blocked.append("Aggressive tone detected (excessive use of capital letters)")
+        return blocked
     
-    # Check if title is all caps (if provided)
     if title and title.isupper() and len(title) > 5:
         reasons.append("Aggressive tone in title (all capital letters)")
     
-    # Check for contextual offensive patterns
-    for context, patterns in CONTEXTUAL_PATTERNS.items():
-        for pattern in patterns:
-            if re.search(pattern, clean_content, re.IGNORECASE):
-                reasons.append(f"Potential {context} content detected")
+    buffer = ""
+    if not reasons:
+        for piece in _clean_pieces(pieces):
+            counts["length"] += len(piece)
+            if counts["length"] > MAX_CONTENT_LENGTH:
+                reasons.append(f"Content too long (maximum {MAX_CONTENT_LENGTH} characters)")
                 break
+            buffer += piece
+            while len(buffer) >= chunk_size:
+                # Cut at the last whitespace so words are never split between chunks
+                cut = next((index for index in range(len(buffer) - 1, 0, -1) if buffer[index].isspace()), 0)
+                if not cut:
+                    break
+                scan(buffer[:cut])
+                buffer = buffer[cut:]
+                reasons.extend(blocking())
+                if reasons:
+                    break
+            if reasons:
+                break
+        else:
+            scan(buffer)
+            if counts["length"] < MIN_CONTENT_LENGTH:
+                reasons.append(f"Content too short (minimum {MIN_CONTENT_LENGTH} characters)")
+            else:
+                reasons.extend(blocking())
+                tokens = counts["tokens"]
+                if not reasons and tokens > 10 and counts["caps"] / tokens > 0.2:
+                    reasons.append("Aggressive tone detected (excessive use of capital letters)")
     
-    # Analyze quality and sentiment
-    quality = analyze_content_quality(clean_content)
-    sentiment = analyze_sentiment(clean_content)
-    
-    # Quality checks
-    if quality["unique_ratio"] < MIN_UNIQUE_WORDS_RATIO and quality["word_count"] > 100:
-        warnings.append("Low vocabulary diversity")
-    
-    # Sentiment check
-    if sentiment["is_negative"]:
-        warnings.append("Predominantly negative tone detected")
-    
-    # Calculate quality score (0-100)
-    if quality["word_count"] > 0:
-        quality_factors = [
-            min(1.0, quality["word_count"] / 500) * 25,  # Word count factor
-            min(1.0, quality["unique_ratio"] / 0.6) * 25,  # Uniqueness factor
-            min(1.0, quality["avg_word_length"] / 5) * 25,  # Word complexity factor
-            min(1.0, (sentiment["sentiment_score"] + 1) / 2) * 25  # Sentiment factor
-        ]
-        quality_score = sum(quality_factors)
-    
-    # Generate improvement suggestions
-    suggestions = generate_improvement_suggestions(content, title)
-    
-    # Final result
+    if counts["exclamations"] > 5:
+        warnings.append("Excessive exclamation marks detected")
+    if suspicious:
+        warnings.append("Suspicious patterns detected in your content")
     return {
         "approved": len(reasons) == 0,
         "reasons": reasons,
         "warnings": warnings,
-        "quality_score": quality_score,
-        "quality_analysis": quality,
-        "sentiment_analysis": sentiment,
-        "suggestions": suggestions,
+        "mode": "fast_fail",
+        "rule_set_version": rule_set.version,
         "moderation_timestamp": datetime.now().isoformat()
     }
+
+# Incremental re-moderation. The clean text is split into paragraphs on blank
+# lines and the rule inputs are kept per paragraph, keyed by a hash of its text,
+# so a resubmitted post only rescans the paragraphs that changed. The blank-line
+# separators are pure whitespace, which no banned term, pattern or sentence
+# terminator matches across, so merging the per-paragraph figures gives the
+# same result as check_content.
+
+def paragraph_cache_version(rule_set: RuleSet) -> str:
+    """Identify what per-paragraph figures depend on; a cache from other rules is discarded."""
+    return f"{rule_set.version}-{_fingerprint(NEGATIVE_SENTIMENT_WORDS)}"
+
+def _paragraph_key(paragraph: str) -> str:
+    return hashlib.sha256(paragraph.encode("utf-8")).hexdigest()[:24]
+
+def _scan_paragraph(paragraph: str, rule_set: RuleSet) -> Dict[str, Any]:
+    """The rule matches and token statistics of one paragraph, as JSON-serializable values."""
+    compiled = rule_set.patterns
+    lower = paragraph.lower()
+    tokens = paragraph.split()
+    words: Dict[str, int] = {}
+    for word in _WORD_PATTERN.findall(lower):
+        words[word] = words.get(word, 0) + 1
+    pieces = [piece.strip() for piece in _SENTENCE_SPLIT.split(paragraph)]
+    return {
+        "terms": sorted(rule_set.terms.find_terms(paragraph)),
+        "suspicious": any(pattern.search(paragraph) for pattern in compiled.suspicious),
+        "contexts": [
+            context for context, patterns in compiled.contextual
+            if any(pattern.search(paragraph) for pattern in patterns)
+        ],
+        "tokens": len(tokens),
+        "token_chars": sum(len(token) for token in tokens),
+        "caps_tokens": sum(1 for token in tokens if token.isupper() and len(token) > 2),
+        "exclamations": paragraph.count('!'),
+        "words": words,
+        # Non-empty sentence pieces, and whether the first and last piece are
+        # non-empty; those run on into the neighbouring paragraph's sentence
+        "sentences": [sum(1 for piece in pieces if piece), bool(pieces[0]), bool(pieces[-1]), len(pieces) == 1],
+        "negative": [word for word in NEGATIVE_SENTIMENT_WORDS if word in lower],
+    }
+
+def _merge_paragraphs(analysis: ContentAnalysis, parts: List[Dict[str, Any]]) -> None:
+    """Fill in the analysis views the rules read from per-paragraph figures, in paragraph order."""
+    views = analysis.__dict__
+    views["found_terms"] = analysis.rules.terms.order({term for part in parts for term in part["terms"]})
+    views["has_suspicious_pattern"] = any(part["suspicious"] for part in parts)
+    matched = {context for part in parts for context in part["contexts"]}
+    views["contexts"] = [context for context, _ in analysis.rules.patterns.contextual if context in matched]
+    
+    token_count = sum(part["tokens"] for part in parts)
+    token_chars = sum(part["token_chars"] for part in parts)
+    views["token_count"] = token_count
+    views["caps_token_count"] = sum(part["caps_tokens"] for part in parts)
+    views["exclamation_count"] = sum(part["exclamations"] for part in parts)
+    
+    words: Dict[str, int] = {}
+    for part in parts:
+        for word, count in part["words"].items():
+            words[word] = words.get(word, 0) + count
+    
+    # A paragraph's trailing piece and the next one's leading piece form one sentence
+    sentence_count = 0
+    open_sentence = False
+    for count, first, last, single in (part["sentences"] for part in parts):
+        if open_sentence and first:
+            count -= 1
+        sentence_count += count
+        open_sentence = (open_sentence or first) if single else last
+    
+    views["quality"] = _quality_from_counts(
+        sum(words.values()), len(words), sum(len(word) * count for word, count in words.items()),
+        _readability_from_counts(sentence_count, token_count, token_chars)
+    )
+    negative = {word for part in parts for word in part["negative"]}
+    views["sentiment"] = _sentiment_from_counts(
+        sum(1 for word in NEGATIVE_SENTIMENT_WORDS if word in negative), token_count
+    )
+
+def check_content_incremental(
+    content: str, title: str = "", paragraph_cache: Optional[Dict[str, Any]] = None
+) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """
+    check_content for a post that was moderated before, rescanning only the
+    paragraphs missing from `paragraph_cache`.
+    
+    Args:
+        content: The post content to check
+        title: The post title
+        paragraph_cache: The paragraph cache returned by the post's previous
+            run, or None for a full scan
+        
+    Returns:
+        The check_content result and the paragraph cache to keep for the
+        next run, holding only the current paragraphs
+    """
+    analysis = ContentAnalysis(content, title)
+    version = paragraph_cache_version(analysis.rules)
+    previous = paragraph_cache["paragraphs"] if paragraph_cache and paragraph_cache.get("version") == version else {}
+    
+    paragraphs: Dict[str, Dict[str, Any]] = {}
+    parts = []
+    for paragraph in analysis.paragraphs:
+        key = _paragraph_key(paragraph)
+        part = paragraphs.get(key) or previous.get(key) or _scan_paragraph(paragraph, analysis.rules)
+        paragraphs[key] = part
+        parts.append(part)
+    _merge_paragraphs(analysis, parts)
+    
+    return _moderate(analysis), {"version": version, "paragraphs": paragraphs}
+
+def _check_item(item: Tuple[str, str]) -> Dict[str, Any]:
+    content, title = item
+    return check_content(content, title)
+
+def check_contents_batch(items: Iterable[Tuple[str, str]], workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """
+    Moderate many (content, title) pairs at once.
+    
+    Args:
+        items: The (content, title) pairs to check
+        workers: Number of worker processes to spread the batch across.
+            None or 1 checks everything in the current process; 0 uses one
+            worker per CPU.
+        
+    Returns:
+        The check_content results, in the same order as the items
+    """
+    items = list(items)
+    if workers == 0:
+        workers = os.cpu_count() or 1
+    if not workers or workers == 1 or len(items) < 2:
+        return [check_content(content, title) for content, title in items]
+    
+    workers = min(workers, len(items))
+    # Hand each worker a few posts at a time to keep pickling overhead low
+    chunksize = max(1, len(items) // (workers * 4))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_check_item, items, chunksize=chunksize))
@@ -0,0 +1,179 @@
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future, ProcessPoolExecutor, TimeoutError
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import metrics
+import moderation
+import settings
+
+logger = logging.getLogger(__name__)
+
+
+class ModerationBusy(Exception):
+    """Raised when the moderation queue is full."""
+
+
+class ModerationTimeout(Exception):
+    """Raised when a moderation job does not finish in time."""
+
+
+def _check_chunk(items: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+    return [moderation.check_content(content, title) for content, title in items]
+
+
+class ModerationExecutor:
+    """
+    Runs CPU-bound moderation in worker processes so it does not hold the
+    request threads or the GIL. Jobs beyond the worker count wait in a bounded
+    queue; with no workers configured, or if the pool breaks, jobs run inline.
+    """
+
+    def __init__(self, workers: int, queue_size: int, timeout: float):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+        # One slot per running or queued job
+        self._slots = threading.BoundedSemaphore(max(1, workers + queue_size))
+
+    @classmethod
+    def from_settings(cls) -> "ModerationExecutor":
+        return cls(settings.MODERATION_WORKERS, settings.MODERATION_QUEUE_SIZE, settings.MODERATION_TIMEOUT)
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            return self._pool
+
+    def _submit(self, fn: Callable, *args: Any, block: bool = False) -> Future:
+        if not self._slots.acquire(blocking=block):
+            raise ModerationBusy("Moderation queue is full")
+        try:
+            future = self._get_pool().submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        # A job that timed out keeps its slot until the worker is actually done with it
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    def _reset_pool(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    @metrics.timed(metrics.MODERATION_LATENCY, "check_content")
+    def check_content(self, content: str, title: str = "", timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Run moderation.check_content in a worker process."""
+        if self.workers <= 0:
+            return moderation.check_content(content, title)
+
+        # Cached results are served without a round trip to a worker
+        cached = moderation.result_cache.get(content, title)
+        if cached is not None:
+            return cached
+
+        try:
+            future = self._submit(moderation.check_content, content, title)
+            result = future.result(timeout=timeout or self.timeout)
+            moderation.result_cache.put(content, title, result)
+            return result
+        except TimeoutError:
+            future.cancel()
+            raise ModerationTimeout("Moderation took too long")
+        except BrokenProcessPool:
+            logger.exception("Moderation pool failed, running moderation inline")
+            self._reset_pool()
+            return moderation.check_content(content, title)
+
+    @metrics.timed(metrics.MODERATION_LATENCY, "check_content_incremental")
+    def check_content_incremental(
+        self, content: str, title: str = "", paragraph_cache: Optional[Dict[str, Any]] = None,
+        timeout: Optional[float] = None
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """
+        Run moderation.check_content_incremental in a worker process.
+        A cached result comes back with a None paragraph cache, so the post keeps its stored one.
+        """
+        cached = moderation.result_cache.get(content, title)
+        if cached is not None:
+            return cached, None
+
+        if self.workers <= 0:
+            result, paragraphs = moderation.check_content_incremental(content, title, paragraph_cache)
+            moderation.result_cache.put(content, title, result)
+            return result, paragraphs
+
+        try:
+            future = self._submit(moderation.check_content_incremental, content, title, paragraph_cache)
+            result, paragraphs = future.result(timeout=timeout or self.timeout)
+            moderation.result_cache.put(content, title, result)
+            return result, paragraphs
+        except TimeoutError:
+            future.cancel()
+            raise ModerationTimeout("Moderation took too long")
+        except BrokenProcessPool:
+            logger.exception("Moderation pool failed, running moderation inline")
+            self._reset_pool()
+            result, paragraphs = moderation.check_content_incremental(content, title, paragraph_cache)
+            moderation.result_cache.put(content, title, result)
+            return result, paragraphs
+
+    @metrics.timed(metrics.MODERATION_LATENCY, "check_contents_batch")
+    def check_contents_batch(self, items: List[Tuple[str, str]], chunksize: int = 16) -> List[Dict[str, Any]]:
+        """
+        Run moderation for many (content, title) pairs across the worker processes.
+        Batches wait for queue slots instead of failing, and each chunk gets
+        the per-job timeout for every post in it.
+        """
+        if self.workers <= 0 or len(items) < 2:
+            return moderation.check_contents_batch(items)
+
+        # Only send posts without a cached result to the workers
+        results = [moderation.result_cache.get(content, title) for content, title in items]
+        missing = [index for index, result in enumerate(results) if result is None]
+        chunks = [missing[i:i + chunksize] for i in range(0, len(missing), chunksize)]
+        try:
+            futures = [self._submit(_check_chunk, [items[index] for index in chunk], block=True) for chunk in chunks]
+            for chunk, future in zip(chunks, futures):
+                for index, result in zip(chunk, future.result(timeout=self.timeout * len(chunk))):
+                    moderation.result_cache.put(*items[index], result)
+                    results[index] = result
+            return results
+        except TimeoutError:
+            for future in futures:
+                future.cancel()
+            raise ModerationTimeout("Moderation took too long")
+        except BrokenProcessPool:
+            logger.exception("Moderation pool failed, running moderation inline")
+            self._reset_pool()
+            return moderation.check_contents_batch(items)
+
+    async def acheck_content(self, content: str, title: str = "", timeout: Optional[float] = None) -> Dict[str, Any]:
+        """check_content for async callers; waits on a thread so the event loop stays free."""
+        return await asyncio.to_thread(self.check_content, content, title, timeout)
+
+    async def acheck_content_incremental(
+        self, content: str, title: str = "", paragraph_cache: Optional[Dict[str, Any]] = None
+    ) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """check_content_incremental for async callers."""
+        return await asyncio.to_thread(self.check_content_incremental, content, title, paragraph_cache)
+
+    async def acheck_contents_batch(self, items: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        """check_contents_batch for async callers."""
+        return await asyncio.to_thread(self.check_contents_batch, items)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=True, cancel_futures=True)
+
+
+executor = ModerationExecutor.from_settings()
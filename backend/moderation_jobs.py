@@ -0,0 +1,201 @@
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import List, Optional
+
+from sqlalchemy import or_, select, update
+from sqlalchemy.orm import Session
+
+import crud
+import database
+import models
+import settings
+from moderation_executor import executor as moderation_executor, ModerationBusy, ModerationTimeout
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue(db: Session, post_id: int) -> models.ModerationJob:
+    """Queue a moderation run for a draft post, reusing any job still waiting for it. The caller commits."""
+    job = (
+        db.query(models.ModerationJob)
+        .filter(models.ModerationJob.post_id == post_id, models.ModerationJob.status.in_(("pending", "running")))
+        .first()
+    )
+    if job is None:
+        job = models.ModerationJob(post_id=post_id, status="pending", attempts=0)
+        db.add(job)
+        db.flush()
+        db.refresh(job)
+    return job
+
+
+def claim_next(db: Session) -> Optional[int]:
+    """
+    Mark the oldest pending job that is due as running and return its id, or
+    None if no job is due.
+    """
+    table = models.ModerationJob.__table__
+    while True:
+        # SKIP LOCKED lets concurrent Postgres workers pass over each other's rows;
+        # other databases rely on the conditional UPDATE below
+        job_id = db.execute(
+            select(table.c.id)
+            .where(table.c.status == "pending", or_(table.c.not_before.is_(None), table.c.not_before <= datetime.now()))
+            .order_by(table.c.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        ).scalar()
+        if job_id is None:
+            db.rollback()
+            return None
+
+        claimed = db.execute(
+            update(table)
+            .where(table.c.id == job_id, table.c.status == "pending")
+            .values(status="running", started_at=datetime.now(), attempts=table.c.attempts + 1)
+        ).rowcount
+        db.commit()
+        if claimed:
+            return job_id
+
+
+def _finish(
+    db: Session, job_id: int, status: str, error: Optional[str] = None, not_before: Optional[datetime] = None
+) -> None:
+    db.execute(
+        update(models.ModerationJob)
+        .where(models.ModerationJob.id == job_id)
+        .values(
+            status=status,
+            error=error,
+            finished_at=datetime.now() if status in ("done", "failed") else None,
+            not_before=not_before,
+        )
+    )
+    db.commit()
+
+
+def run_job(db: Session, job_id: int) -> None:
+    """Moderate the job's post and store the outcome on the post and the job."""
+    job = db.get(models.ModerationJob, job_id)
+    post = db.get(models.Post, job.post_id)
+    if post is None or post.status != "draft":
+        _finish(db, job_id, "failed", "Only draft posts can be submitted for review")
+        return
+
+    try:
+        moderation_result, paragraph_cache = moderation_executor.check_content_incremental(
+            post.content, post.title, post.moderation_paragraphs
+        )
+    except (ModerationBusy, ModerationTimeout) as exc:
+        # Put the job back unless it has run out of attempts, and give the
+        # pool time to drain before it is claimed again
+        if job.attempts < settings.MODERATION_JOB_MAX_ATTEMPTS:
+            delay = settings.MODERATION_JOB_RETRY_DELAY * 2 ** (job.attempts - 1)
+            _finish(db, job_id, "pending", str(exc), datetime.now() + timedelta(seconds=delay))
+        else:
+            _finish(db, job_id, "failed", str(exc))
+        return
+
+    # Only store the outcome if the post is still the draft that was moderated
+    updated = crud.transition_post(
+        db, post.id, ("draft",), crud.moderation_values(moderation_result, paragraph_cache), post.version
+    )
+    db.commit()
+    if updated is None and crud.post_status(db, post.id) == "draft":
+        # Edited during moderation: run again on the new content
+        _finish(db, job_id, "pending", "Post was edited during moderation")
+        return
+    _finish(db, job_id, "done")
+
+
+def requeue_stale(db: Session, older_than: timedelta) -> int:
+    """Return jobs left running by a crashed worker to the queue."""
+    requeued = db.execute(
+        update(models.ModerationJob)
+        .where(models.ModerationJob.status == "running", models.ModerationJob.started_at < datetime.now() - older_than)
+        .values(status="pending")
+    ).rowcount
+    db.commit()
+    return requeued
+
+
+def drain(db: Session) -> int:
+    """Process queued jobs until the queue is empty and return how many ran."""
+    processed = 0
+    while True:
+        job_id = claim_next(db)
+        if job_id is None:
+            return processed
+        try:
+            run_job(db, job_id)
+        except Exception as exc:
+            logger.exception("Moderation job %s failed", job_id)
+            db.rollback()
+            _finish(db, job_id, "failed", str(exc))
+        processed += 1
+
+
+class JobWorkerPool:
+    """Background threads that drain the moderation job table."""
+
+    def __init__(self, workers: int, poll_interval: float):
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self._stop = threading.Event()
+        self._wakeup = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def start(self) -> None:
+        # Jobs still marked running from a previous process will never finish on their own
+        db = database.SessionLocal()
+        try:
+            requeue_stale(db, timedelta(seconds=settings.MODERATION_TIMEOUT * 2))
+        finally:
+            db.close()
+
+        self._stop.clear()
+        for index in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"moderation-job-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def notify(self) -> None:
+        """Wake idle workers after a job has been queued."""
+        self._wakeup.set()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            db = database.SessionLocal()
+            try:
+                processed = drain(db)
+            except Exception:
+                logger.exception("Moderation job worker error")
+                processed = 0
+            finally:
+                db.close()
+            if not processed:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+
+workers = JobWorkerPool(settings.MODERATION_JOB_WORKERS, settings.MODERATION_JOB_POLL_INTERVAL)
+
+
+if __name__ == "__main__":
+    # Run job workers as a standalone process
+    logging.basicConfig(level=logging.INFO)
+    standalone = JobWorkerPool(max(1, settings.MODERATION_JOB_WORKERS), settings.MODERATION_JOB_POLL_INTERVAL)
+    standalone.start()
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        standalone.stop()
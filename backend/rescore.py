@@ -0,0 +1,145 @@
+import argparse
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import bindparam, select, update
+from sqlalchemy.orm import Session
+
+import database
+import models
+import moderation
+from scoring import FACTOR_INPUTS, score_batch
+
+logger = logging.getLogger(__name__)
+
+# Scores closer than this to the stored one are not rewritten
+SCORE_TOLERANCE = 1e-9
+
+
+def _stored_inputs(moderation_data: Optional[Dict[str, Any]]) -> Optional[Dict[str, float]]:
+    """Factor inputs from a stored moderation result, or None if it lacks the analyses."""
+    try:
+        return moderation.quality_score_inputs(
+            moderation_data["quality_analysis"], moderation_data["sentiment_analysis"]
+        )
+    except (KeyError, TypeError):
+        return None
+
+
+def extract_stats(db: Session, rows: List[Any]) -> np.ndarray:
+    """
+    Factor inputs for a batch of (id, moderation_data) rows as an array.
+    They come from the stored analyses; only posts stored without them have
+    their content loaded and tokenized again.
+    """
+    inputs = [_stored_inputs(row.moderation_data) for row in rows]
+    missing = [row.id for row, row_inputs in zip(rows, inputs) if row_inputs is None]
+    if missing:
+        contents = dict(db.execute(select(models.Post.id, models.Post.content).where(models.Post.id.in_(missing))).all())
+        for index, row in enumerate(rows):
+            if inputs[index] is None:
+                analysis = moderation.ContentAnalysis(contents[row.id])
+                inputs[index] = moderation.quality_score_inputs(analysis.quality, analysis.sentiment)
+    stats = np.array([[row_inputs[name] for name in FACTOR_INPUTS] for row_inputs in inputs], dtype=float)
+    return stats.reshape(-1, len(FACTOR_INPUTS))
+
+
+def iter_scored_batches(db: Session, batch_size: int) -> Iterator[List[Any]]:
+    """Moderated posts in id order, one keyset page at a time."""
+    post = models.Post
+    last_id = 0
+    while True:
+        rows = db.execute(
+            select(post.id, post.quality_score, post.moderation_data)
+            .where(post.quality_score.isnot(None), post.id > last_id)
+            .order_by(post.id)
+            .limit(batch_size)
+        ).all()
+        if not rows:
+            return
+        yield rows
+        last_id = rows[-1].id
+
+
+def rescore_posts(db: Session, batch_size: int = 1000, dry_run: bool = False) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Recompute quality_score for every moderated post with the current
+    QUALITY_SCORE_FACTORS and write the changed ones back, one bulk UPDATE and
+    commit per batch. A dry run writes nothing. Returns the old and new
+    scores of all posts, in id order.
+    """
+    table = models.Post.__table__
+    stmt = (
+        update(table)
+        .where(table.c.id == bindparam("b_id"))
+        .values(quality_score=bindparam("quality_score"), moderation_data=bindparam("moderation_data"))
+    )
+    old_batches, new_batches = [], []
+    for rows in iter_scored_batches(db, batch_size):
+        old = np.array([row.quality_score for row in rows], dtype=float)
+        new = score_batch(extract_stats(db, rows))
+        old_batches.append(old)
+        new_batches.append(new)
+
+        changed = np.flatnonzero(np.abs(new - old) > SCORE_TOLERANCE)
+        if dry_run or not len(changed):
+            db.rollback()
+            continue
+        updates = []
+        for index in changed:
+            row = rows[index]
+            score = float(new[index])
+            # Keep the stored moderation result in step with the column
+            data = {**row.moderation_data, "quality_score": score} if row.moderation_data else row.moderation_data
+            updates.append({"b_id": row.id, "quality_score": score, "moderation_data": data})
+        db.execute(stmt, updates)
+        db.commit()
+        logger.info("Rescored %d of %d posts up to id %d", len(updates), len(rows), rows[-1].id)
+
+    if not old_batches:
+        return np.empty(0), np.empty(0)
+    return np.concatenate(old_batches), np.concatenate(new_batches)
+
+
+def describe_shift(old: np.ndarray, new: np.ndarray, bins: int = 10) -> str:
+    """A text summary of how the score distribution moves from `old` to `new`."""
+    if not len(old):
+        return "No moderated posts to rescore"
+    delta = new - old
+    lines = [
+        f"Posts: {len(old)}, changed: {int(np.count_nonzero(np.abs(delta) > SCORE_TOLERANCE))}",
+        f"Mean delta: {delta.mean():+.3f}, max |delta|: {np.abs(delta).max():.3f}",
+        "",
+        f"{'':<8}{'mean':>9}{'std':>9}{'p10':>9}{'p50':>9}{'p90':>9}",
+    ]
+    for label, scores in (("old", old), ("new", new)):
+        p10, p50, p90 = np.percentile(scores, [10, 50, 90])
+        lines.append(f"{label:<8}{scores.mean():>9.2f}{scores.std():>9.2f}{p10:>9.2f}{p50:>9.2f}{p90:>9.2f}")
+
+    edges = np.linspace(0, 100, bins + 1)
+    old_counts, _ = np.histogram(np.clip(old, 0, 100), edges)
+    new_counts, _ = np.histogram(np.clip(new, 0, 100), edges)
+    lines += ["", f"{'score':<12}{'old':>9}{'new':>9}{'change':>9}"]
+    for low, high, before, after in zip(edges, edges[1:], old_counts, new_counts):
+        lines.append(f"{f'{low:.0f}-{high:.0f}':<12}{before:>9}{after:>9}{after - before:>+9}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Recompute stored quality scores after QUALITY_SCORE_FACTORS changes."
+    )
+    parser.add_argument("--batch-size", type=int, default=1000, help="posts loaded and updated per round trip")
+    parser.add_argument("--dry-run", action="store_true", help="print the score distribution shift without writing")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    db = database.SessionLocal()
+    try:
+        old_scores, new_scores = rescore_posts(db, args.batch_size, args.dry_run)
+    finally:
+        db.close()
+    print(describe_shift(old_scores, new_scores))
+    if args.dry_run:
+        print("\nDry run, nothing was written")
@@ -0,0 +1,20 @@
+"""
+JSON response class encoded with orjson.
+
+FastAPI deprecated its own ORJSONResponse in 0.131, so the app keeps this
+small equivalent instead of pinning FastAPI.
+"""
+from typing import Any
+
+import orjson
+from starlette.responses import JSONResponse
+
+# OPT_UTC_Z writes UTC datetimes with a "Z" suffix, the way Pydantic does, not "+00:00"
+ORJSON_OPTIONS = orjson.OPT_NON_STR_KEYS | orjson.OPT_UTC_Z
+
+
+class ORJSONResponse(JSONResponse):
+    """JSONResponse that renders its content with orjson."""
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=ORJSON_OPTIONS)
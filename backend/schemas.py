@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field, validator
 from typing import Optional, Dict, List, Any
-from datetime import datetime
+from datetime import date, datetime
 
 class PostBase(BaseModel):
     """Base schema for post data."""
@@ -25,6 +25,7 @@ class ModerationDetail(BaseModel):
     sentiment_analysis: Dict[str, Any]
     suggestions: Dict[str, List[str]]
     warnings: List[str]
+    rule_set_version: Optional[str] = None  # Missing on results stored before rule sets were versioned
     moderation_timestamp: str
 
 class Post(PostBase):
@@ -48,6 +49,57 @@ class Post(PostBase):
             raise ValueError('Invalid status')
         return v
 
+class PostSummary(BaseModel):
+    """
+    Schema for posts in list responses. The heavy content and moderation_data
+    fields are only included when requested with the fields parameter.
+    """
+    id: int
+    title: str
+    tags: Optional[str] = None
+    status: str
+    flagged_reasons: Optional[str] = None
+    quality_score: Optional[float] = None
+    warnings: Optional[str] = None
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    published_at: Optional[datetime] = None
+    content: Optional[str] = None
+    moderation_data: Optional[Dict[str, Any]] = None
+
+class PostSearchResult(BaseModel):
+    """Schema for a search hit, with a highlighted content snippet in place of the content."""
+    id: int
+    title: str
+    tags: Optional[str] = None
+    status: str
+    created_at: datetime
+    updated_at: Optional[datetime] = None
+    published_at: Optional[datetime] = None
+    rank: float
+    snippet: Optional[str] = None
+
+class TagCount(BaseModel):
+    """Schema for a tag and the number of posts using it."""
+    name: str
+    count: int
+
+class ImportLineError(BaseModel):
+    """Schema for a rejected line of an import."""
+    line: int
+    error: str
+
+class ImportResult(BaseModel):
+    """Schema for the outcome of a bulk import."""
+    imported: int
+    failed: int
+    errors: List[ImportLineError]
+
+class DailyCount(BaseModel):
+    """Schema for a per-day count."""
+    date: date
+    count: int
+
 class PostStats(BaseModel):
     """Schema for post statistics."""
     total: int
@@ -55,3 +107,75 @@ class PostStats(BaseModel):
     flagged: int
     approved: int
     published: int
+    published_per_day: Optional[List[DailyCount]] = None
+
+
+class BatchSubmitRequest(BaseModel):
+    """Schema for submitting many draft posts for review at once."""
+    post_ids: List[int] = Field(..., min_length=1, max_length=1000)
+    parallel: bool = False  # Spread moderation across worker processes
+
+class BatchSubmitResult(BaseModel):
+    """Schema for the outcome of one post in a batch submission."""
+    post_id: int
+    status: Optional[str] = None
+    quality_score: Optional[float] = None
+    flagged_reasons: Optional[str] = None
+    warnings: Optional[str] = None
+    error: Optional[str] = None
+
+
+class ModerationJob(BaseModel):
+    """Schema for returning the state of a queued moderation job."""
+    id: int
+    post_id: int
+    status: str
+    attempts: int
+    error: Optional[str] = None
+    created_at: Optional[datetime] = None
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    not_before: Optional[datetime] = None
+    
+    class Config:
+        from_attributes = True
+
+
+class ModerationCacheStats(BaseModel):
+    """Schema for moderation result cache counters."""
+    hits: int
+    misses: int
+    hit_rate: float
+    size: int
+    maxsize: int
+
+
+class ModerationRuleSet(BaseModel):
+    """Schema for the moderation rule set in effect."""
+    version: str
+    source: str
+    loaded_at: datetime
+    banned_words: int
+    inappropriate_phrases: int
+    suspicious_patterns: int
+    contextual_patterns: int
+
+
+class ModerationCheck(BaseModel):
+    """Schema for content to pre-flight before saving or submitting it."""
+    title: str = Field("", max_length=100)
+    content: str
+
+
+class ModerationCheckResult(BaseModel):
+    """Schema for a fast-fail moderation check; the analysis is only present when requested."""
+    approved: bool
+    reasons: List[str]
+    warnings: List[str]
+    mode: str
+    quality_score: Optional[float] = None
+    quality_analysis: Optional[Dict[str, Any]] = None
+    sentiment_analysis: Optional[Dict[str, Any]] = None
+    suggestions: Optional[Dict[str, List[str]]] = None
+    rule_set_version: str
+    moderation_timestamp: str
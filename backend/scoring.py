@@ -0,0 +1,23 @@
+"""
+Vectorized quality scoring, kept apart from rescore so it can be used and
+tested without a database.
+"""
+import numpy as np
+
+import moderation
+
+FACTOR_INPUTS = tuple(name for name, _, _ in moderation.QUALITY_SCORE_FACTORS)
+WORD_COUNT_COLUMN = FACTOR_INPUTS.index("word_count")
+
+
+def score_batch(stats: np.ndarray) -> np.ndarray:
+    """
+    Quality scores for a batch at once. `stats` has one row per post and one
+    column per QUALITY_SCORE_FACTORS input, in table order.
+    """
+    targets = np.array([target for _, target, _ in moderation.QUALITY_SCORE_FACTORS], dtype=float)
+    points = np.array([points for _, _, points in moderation.QUALITY_SCORE_FACTORS], dtype=float)
+    scores = (np.minimum(1.0, stats / targets) * points).sum(axis=1)
+    # Posts without words score 0 whatever the other factors say
+    scores[stats[:, WORD_COUNT_COLUMN] == 0] = 0.0
+    return scores
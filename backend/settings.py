@@ -0,0 +1,74 @@
+import os
+from dotenv import load_dotenv
+
+# Load environment variables
+load_dotenv()
+
+
+def _int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return int(value) if value not in (None, "") else default
+
+
+def _bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    return value.strip().lower() in ("1", "true", "yes", "on") if value not in (None, "") else default
+
+
+def _float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return float(value) if value not in (None, "") else default
+
+
+# Primary database, and an optional read replica used by GET endpoints
+DATABASE_URL = os.getenv("DATABASE_URL")
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL") or None
+
+# Connection pool, per engine
+DB_POOL_SIZE = _int("DB_POOL_SIZE", 5)
+DB_MAX_OVERFLOW = _int("DB_MAX_OVERFLOW", 10)
+DB_POOL_TIMEOUT = _float("DB_POOL_TIMEOUT", 30.0)  # Seconds to wait for a free connection
+DB_POOL_RECYCLE = _int("DB_POOL_RECYCLE", 1800)  # Seconds before a connection is replaced (-1 never)
+DB_POOL_PRE_PING = _bool("DB_POOL_PRE_PING", True)
+
+# Per-statement timeout in milliseconds on Postgres (0 disables it)
+DB_STATEMENT_TIMEOUT_MS = _int("DB_STATEMENT_TIMEOUT_MS", 0)
+
+# Moderation worker processes (0 runs moderation inline on the request thread)
+MODERATION_WORKERS = _int("MODERATION_WORKERS", 0)
+
+# Moderation jobs allowed to wait for a worker before new requests are turned away
+MODERATION_QUEUE_SIZE = _int("MODERATION_QUEUE_SIZE", 32)
+
+# Seconds a request waits for a moderation job before giving up
+MODERATION_TIMEOUT = _float("MODERATION_TIMEOUT", 10.0)
+
+# JSON file with the moderation rule lists, checked for changes every poll
+# interval (seconds); unset uses the built-in lists
+MODERATION_RULES_FILE = os.getenv("MODERATION_RULES_FILE") or None
+MODERATION_RULES_POLL_INTERVAL = _float("MODERATION_RULES_POLL_INTERVAL", 5.0)
+
+# Moderation results kept in the in-process LRU cache (0 disables caching)
+MODERATION_CACHE_SIZE = _int("MODERATION_CACHE_SIZE", 1024)
+
+# Background threads draining the moderation job queue (0 leaves draining to a
+# separate `python moderation_jobs.py` process)
+MODERATION_JOB_WORKERS = _int("MODERATION_JOB_WORKERS", 1)
+
+# Seconds an idle job worker waits before checking the queue again
+MODERATION_JOB_POLL_INTERVAL = _float("MODERATION_JOB_POLL_INTERVAL", 1.0)
+
+# Attempts before a job that keeps hitting a busy or slow moderation pool fails
+MODERATION_JOB_MAX_ATTEMPTS = _int("MODERATION_JOB_MAX_ATTEMPTS", 3)
+
+# Seconds before such a job is retried, doubled after every further attempt
+MODERATION_JOB_RETRY_DELAY = _float("MODERATION_JOB_RETRY_DELAY", 2.0)
+
+# Serve /stats/ from the post_status_counts table instead of counting posts
+STATS_COUNTERS = _bool("STATS_COUNTERS", False)
+
+# Rows fetched per round trip when streaming GET /posts/export
+EXPORT_BATCH_SIZE = _int("EXPORT_BATCH_SIZE", 1000)
+
+# Records validated and inserted per batch by POST /posts/import
+IMPORT_BATCH_SIZE = _int("IMPORT_BATCH_SIZE", 500)
@@ -0,0 +1,348 @@
+import csv
+import gzip
+import io
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import update
+from sqlalchemy.exc import DBAPIError
+
+import crud
+import database
+import main
+import models
+import moderation
+import settings
+
+CLEAN_CONTENT = "This is a completely clean post with appropriate content and sufficient length to pass the minimum requirements."
+SHORT_CONTENT = "Far too short to pass."
+
+@pytest.fixture
+def client(monkeypatch, empty_database):
+    monkeypatch.setattr(settings, "STATS_COUNTERS", True)
+    # The lifespan reconciles the counters from the now empty tables
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+def create_post(client, content=CLEAN_CONTENT, tags=None, title="A post"):
+    response = client.post("/posts/", json={"title": title, "content": content, "tags": tags})
+    assert response.status_code == 200
+    return response.json()["id"]
+
+def assert_counters_match(client, **expected):
+    """The stored counters agree with a fresh recount, and with `expected`."""
+    stats = client.get("/stats/").json()
+    assert stats == client.post("/stats/reconcile/").json()
+    for status, count in expected.items():
+        assert stats[status] == count
+    return stats
+
+def test_status_counters_follow_transitions(client):
+    clean = create_post(client)
+    short = create_post(client, SHORT_CONTENT)
+    other = create_post(client)
+    assert_counters_match(client, total=3, draft=3)
+    
+    assert client.post(f"/posts/{clean}/submit/").json()["status"] == "approved"
+    assert_counters_match(client, draft=2, approved=1)
+    
+    # Posts that are not drafts or do not exist are reported, not counted
+    results = client.post("/posts/submit-batch/", json={"post_ids": [short, other, clean, 999999]}).json()
+    assert [result.get("status") for result in results] == ["flagged", "approved", None, None]
+    assert results[2]["error"] == "Only draft posts can be submitted for review"
+    assert results[3]["error"] == "Post not found"
+    assert_counters_match(client, draft=0, flagged=1, approved=2)
+    
+    assert client.patch(f"/posts/{clean}/publish/").json()["status"] == "published"
+    assert_counters_match(client, approved=1, published=1)
+    
+    # Editing an approved post sends it back to draft; a flagged one stays flagged
+    assert client.patch(f"/posts/{other}", json={"title": "Retitled"}).json()["status"] == "draft"
+    assert client.patch(f"/posts/{short}", json={"content": CLEAN_CONTENT}).json()["status"] == "flagged"
+    assert_counters_match(client, total=3, draft=1, flagged=1, approved=0, published=1)
+
+def test_reconcile_repairs_drifted_counters(client):
+    create_post(client)
+    create_post(client)
+    with database.engine.begin() as conn:
+        table = models.PostStatusCount.__table__
+        conn.execute(update(table).values(count=42))
+    assert client.get("/stats/").json()["draft"] == 42
+    
+    assert client.post("/stats/reconcile/").json()["draft"] == 2
+    assert_counters_match(client, total=2, draft=2)
+
+def test_transition_errors_tell_missing_from_wrong_status(client):
+    post_id = create_post(client)
+    assert client.patch("/posts/999999/publish/").status_code == 404
+    assert client.patch(f"/posts/{post_id}/publish/").status_code == 400
+    
+    assert client.post(f"/posts/{post_id}/submit/").status_code == 200
+    assert client.post(f"/posts/{post_id}/submit/").status_code == 400
+    assert client.post("/posts/999999/submit/").status_code == 404
+    
+    assert client.patch(f"/posts/{post_id}/publish/").status_code == 200
+    assert client.patch(f"/posts/{post_id}", json={"title": "Too late"}).status_code == 400
+    assert client.patch("/posts/999999", json={"title": "Nobody"}).status_code == 404
+
+def edit_post(post_id, content):
+    """Edit a post behind the API's back, the way PATCH does, leaving updated_at to the database."""
+    with database.SessionLocal() as db:
+        assert crud.transition_post(db, post_id, ("draft", "flagged"), {"content": content}) is not None
+        db.commit()
+
+def test_submit_conflicts_with_edit_during_moderation(client, monkeypatch):
+    post_id = create_post(client)
+    check = main.moderation_executor.acheck_content_incremental
+    
+    async def edited_meanwhile(*args):
+        result = await check(*args)
+        # The edit usually lands in the same second as the read, so updated_at can't tell
+        edit_post(post_id, "You are an idiot and everyone here knows it, so stop posting here.")
+        return result
+    
+    monkeypatch.setattr(main.moderation_executor, "acheck_content_incremental", edited_meanwhile)
+    assert client.post(f"/posts/{post_id}/submit/").status_code == 409
+    assert client.get(f"/posts/{post_id}").json()["status"] == "draft"
+    assert_counters_match(client, draft=1, approved=0)
+
+def test_batch_submit_skips_posts_edited_during_moderation(client, monkeypatch):
+    edited = create_post(client)
+    untouched = create_post(client)
+    check = moderation.check_contents_batch
+    
+    def edited_meanwhile(items):
+        results = check(items)
+        edit_post(edited, "You are an idiot and everyone here knows it, so stop posting here.")
+        return results
+    
+    monkeypatch.setattr(moderation, "check_contents_batch", edited_meanwhile)
+    results = client.post("/posts/submit-batch/", json={"post_ids": [edited, untouched]}).json()
+    assert results[0]["error"] == "Post changed during moderation, please submit again"
+    assert results[1]["status"] == "approved"
+    assert client.get(f"/posts/{edited}").json()["status"] == "draft"
+    assert_counters_match(client, draft=1, approved=1)
+
+def test_submit_reuses_cached_result(client, monkeypatch):
+    first = create_post(client)
+    second = create_post(client)
+    assert client.post(f"/posts/{first}/submit/").json()["status"] == "approved"
+    
+    def rescan(*args):
+        raise AssertionError("an identical post was rescanned")
+    
+    monkeypatch.setattr(moderation, "check_content_incremental", rescan)
+    hits = moderation.result_cache.info()["hits"]
+    assert client.post(f"/posts/{second}/submit/").json()["status"] == "approved"
+    assert moderation.result_cache.info()["hits"] == hits + 1
+
+def test_submit_releases_connection_during_moderation(client, monkeypatch):
+    single = create_post(client)
+    batch = create_post(client)
+    checked_out = []
+    check = main.moderation_executor.acheck_content_incremental
+    check_batch = moderation.check_contents_batch
+    
+    async def recording(*args):
+        checked_out.append(database.async_engine.pool.checkedout())
+        return await check(*args)
+    
+    def recording_batch(items):
+        checked_out.append(database.async_engine.pool.checkedout())
+        return check_batch(items)
+    
+    monkeypatch.setattr(main.moderation_executor, "acheck_content_incremental", recording)
+    monkeypatch.setattr(moderation, "check_contents_batch", recording_batch)
+    assert client.post(f"/posts/{single}/submit/").json()["status"] == "approved"
+    assert client.post("/posts/submit-batch/", json={"post_ids": [batch]}).json()[0]["status"] == "approved"
+    assert checked_out == [0, 0]
+
+def test_tag_changes_update_post_counts(client):
+    first = create_post(client, tags="Python, web")
+    second = create_post(client, tags="python")
+    assert client.get("/tags/").json() == [{"name": "python", "count": 2}, {"name": "web", "count": 1}]
+    
+    # Only the difference is applied; tags no post carries drop out of the list
+    client.patch(f"/posts/{first}", json={"tags": "python, databases"})
+    assert client.get("/tags/").json() == [{"name": "python", "count": 2}, {"name": "databases", "count": 1}]
+    
+    client.patch(f"/posts/{second}", json={"tags": ""})
+    assert client.get("/tags/").json() == [{"name": "databases", "count": 1}, {"name": "python", "count": 1}]
+    assert client.get(f"/posts/{second}").json()["tags"] is None
+
+def test_list_filters_by_tag(client):
+    python_post = create_post(client, tags="python, web")
+    web_post = create_post(client, tags="web")
+    create_post(client)
+    
+    def listed(query):
+        return sorted(post["id"] for post in client.get(f"/posts/?{query}").json())
+    
+    assert listed("tag=python") == [python_post]
+    assert listed("tag=WEB") == sorted([python_post, web_post])
+    assert listed("tag=missing") == []
+    
+    client.post(f"/posts/{python_post}/submit/")
+    assert listed("tag=web&status=approved") == [python_post]
+    assert listed("tag=web&status=draft") == [web_post]
+
+def test_search_snippets_drop_html_tags(client):
+    paragraph = '<p class="intro">Plain words to pad the paragraph out well beyond the snippet window here.</p>'
+    content = paragraph * 3 + '<p>The <strong>zeppelin</strong> <a href="https://example.com/zeppelin">docked</a>.</p>' + paragraph * 3
+    post_id = create_post(client, content)
+    
+    hits = client.get("/posts/search", params={"q": "zeppelin"}).json()
+    assert [hit["id"] for hit in hits] == [post_id]
+    snippet = hits[0]["snippet"]
+    assert "<mark>zeppelin</mark>" in snippet
+    assert "<" not in snippet.replace("<mark>", "").replace("</mark>", "")
+    assert ">" not in snippet.replace("<mark>", "").replace("</mark>", "")
+
+def test_conditional_gets_see_same_second_edits(client):
+    post_id = create_post(client)
+    post = client.get(f"/posts/{post_id}")
+    page = client.get("/posts/?fields=content")
+    assert client.get(f"/posts/{post_id}", headers={"If-None-Match": post.headers["ETag"]}).status_code == 304
+    assert client.get("/posts/?fields=content", headers={"If-None-Match": page.headers["ETag"]}).status_code == 304
+    
+    # updated_at may not move within the second; the version does
+    edit_post(post_id, CLEAN_CONTENT + " Now with an extra sentence.")
+    post = client.get(f"/posts/{post_id}", headers={"If-None-Match": post.headers["ETag"]})
+    assert post.status_code == 200 and post.json()["content"].endswith("extra sentence.")
+    page = client.get("/posts/?fields=content", headers={"If-None-Match": page.headers["ETag"]})
+    assert page.status_code == 200 and page.json()[0]["content"].endswith("extra sentence.")
+    assert "version" not in page.json()[0]
+
+def test_list_pages_follow_the_cursor(client):
+    post_ids = [create_post(client, title=f"Post {i}") for i in range(5)]
+    
+    def all_pages(params):
+        pages = []
+        response = client.get("/posts/", params=params)
+        while True:
+            assert response.status_code == 200
+            pages.append([post["id"] for post in response.json()])
+            if "X-Next-Cursor" not in response.headers:
+                return pages
+            assert response.headers["X-Next-Cursor"] in response.headers["Link"]
+            response = client.get("/posts/", params={**params, "cursor": response.headers["X-Next-Cursor"]})
+    
+    # Posts made in the same second fall back to id order
+    newest_first = post_ids[::-1]
+    assert all_pages({"limit": 2}) == [newest_first[:2], newest_first[2:4], newest_first[4:]]
+    assert all_pages({"limit": 2, "sort": "created_at"}) == [post_ids[:2], post_ids[2:4], post_ids[4:]]
+    assert all_pages({"limit": 5}) == [newest_first]
+    
+    assert client.get("/posts/", params={"cursor": "not-a-cursor"}).status_code == 400
+
+def test_list_fields_select_heavy_columns(client):
+    post_id = create_post(client)
+    client.post(f"/posts/{post_id}/submit/")
+    
+    summary, = client.get("/posts/").json()
+    assert summary["id"] == post_id and summary["status"] == "approved"
+    assert "content" not in summary and "moderation_data" not in summary
+    
+    with_content, = client.get("/posts/", params={"fields": "content"}).json()
+    assert with_content["content"] == CLEAN_CONTENT
+    assert "moderation_data" not in with_content
+    
+    full, = client.get("/posts/", params={"fields": "content, moderation_data"}).json()
+    assert full["content"] == CLEAN_CONTENT
+    assert full["moderation_data"]["approved"]
+    
+    response = client.get("/posts/", params={"fields": "content,password"})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Unknown fields: password"
+
+def test_export_streams_csv_and_gzip(client):
+    tricky = create_post(client, title='Commas, "quotes" and\nnewlines')
+    plain = create_post(client)
+    client.post(f"/posts/{plain}/submit/")
+    
+    response = client.get("/posts/export", params={"format": "csv"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    assert response.headers["content-disposition"] == 'attachment; filename="posts.csv"'
+    header, *rows = csv.reader(io.StringIO(response.text))
+    assert tuple(header) == crud.EXPORT_COLUMNS
+    by_id = {int(row[0]): dict(zip(header, row)) for row in rows}
+    assert set(by_id) == {tricky, plain}
+    assert by_id[tricky]["title"] == 'Commas, "quotes" and\nnewlines'
+    assert json.loads(by_id[plain]["moderation_data"])["approved"]
+    
+    response = client.get("/posts/export", params={"format": "ndjson", "status": "approved", "gzip": "true"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/gzip"
+    assert response.headers["content-disposition"] == 'attachment; filename="posts.ndjson.gz"'
+    lines = gzip.decompress(response.content).decode("utf-8").splitlines()
+    assert [json.loads(line)["id"] for line in lines] == [plain]
+    
+    # The CSV header is written even when nothing matches
+    response = client.get("/posts/export", params={"format": "csv", "status": "published", "gzip": "true"})
+    assert gzip.decompress(response.content).decode("utf-8").splitlines() == [",".join(crud.EXPORT_COLUMNS)]
+
+def test_import_reports_malformed_lines(client):
+    body = "\n".join([
+        json.dumps({"title": "First import", "content": CLEAN_CONTENT, "tags": "imported"}),
+        "{not json",
+        "",
+        json.dumps({"title": "", "content": CLEAN_CONTENT}),
+        json.dumps({"content": CLEAN_CONTENT}),
+        json.dumps({"title": "Second import", "content": CLEAN_CONTENT}),
+        json.dumps({"title": "Third import", "content": CLEAN_CONTENT}),
+    ])
+    response = client.post("/posts/import", params={"batch_size": 2}, content=body.encode("utf-8"))
+    assert response.status_code == 200
+    report = response.json()
+    assert report["imported"] == 3
+    assert report["failed"] == 3
+    # Blank lines are skipped but still counted
+    assert [error["line"] for error in report["errors"]] == [2, 4, 5]
+    assert "title" in report["errors"][1]["error"]
+    assert report["errors"][2]["error"].startswith("title: Field required")
+    
+    titles = sorted(post["title"] for post in client.get("/posts/").json())
+    assert titles == ["First import", "Second import", "Third import"]
+    assert_counters_match(client, total=3, draft=3)
+
+def test_metrics_cover_requests_and_failed_queries(client):
+    create_post(client)
+    assert client.get("/posts/").status_code == 200
+    
+    # A failing statement does not leave its start time on the connection
+    with database.engine.connect() as conn:
+        with pytest.raises(DBAPIError):
+            conn.exec_driver_sql("SELECT * FROM no_such_table")
+        assert conn.info["query_start"] == []
+        conn.exec_driver_sql("SELECT 1")
+        assert conn.info["query_start"] == []
+    
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert 'http_requests_total{method="GET",route="/posts/",status="200"}' in text
+    assert 'http_request_duration_seconds_count{method="GET",route="/posts/"}' in text
+    assert 'http_requests_total{method="POST",route="/posts/",status="200"}' in text
+    assert 'db_query_duration_seconds_count{engine="primary",statement="SELECT"}' in text
+
+def test_preflight_streams_oversized_content(client, monkeypatch):
+    def full_analysis(*args, **kwargs):
+        raise AssertionError("oversized content was analysed in full")
+    
+    content = "Plain sentence with ordinary words for padding. " * 20000
+    with monkeypatch.context() as patch:
+        patch.setattr(moderation, "check_content", full_analysis)
+        response = client.post(
+            "/moderation/preflight/", params={"with_analysis": "true"}, json={"title": "Long", "content": content}
+        )
+    assert response.status_code == 200
+    result = response.json()
+    assert result["mode"] == "fast_fail"
+    assert result["reasons"] == [f"Content too long (maximum {moderation.MAX_CONTENT_LENGTH} characters)"]
+    assert "quality_analysis" not in result
+    
+    result = client.post("/moderation/preflight/", json={"title": "Short", "content": CLEAN_CONTENT}).json()
+    assert result["approved"] and result["mode"] == "fast_fail"
@@ -1,5 +1,9 @@
+import json
+import os
+import time
 import pytest
-from moderation import check_content, MIN_CONTENT_LENGTH, MAX_CONTENT_LENGTH, BANNED_WORDS
+import moderation
+from moderation import check_content, MIN_CONTENT_LENGTH, MAX_CONTENT_LENGTH, BANNED_WORDS, TermMatcher
 
 def test_content_length_validation():
     # Test content that is too short
@@ -74,3 +78,281 @@ def test_title_moderation():
     # Test normal title
     result = check_content("This is normal content that is long enough to pass the length check." + "a" * 30, "This is a normal title")
     assert result["approved"]
+
+def test_term_matcher_word_boundaries():
+    # Banned words inside longer words should not be flagged
+    content = "Hello there, this is a passing remark about classic assembly language and whatever else."
+    result = check_content(content)
+    assert not any("Banned words" in reason for reason in result["reasons"])
+    
+    # Overlapping words and phrases are all reported in list order
+    words, phrases = TermMatcher(BANNED_WORDS, ["go to hell", "screw you"]).find("Screw you, just go to HELL.")
+    assert words == ["hell", "screw"]
+    assert phrases == ["go to hell", "screw you"]
+
+def _substring_reasons(content):
+    """The banned word and phrase reasons of the original per-term substring scan."""
+    text = moderation.strip_html(content).lower()
+    words = [word for word in BANNED_WORDS if word.lower() in text]
+    phrases = [phrase for phrase in moderation.INAPPROPRIATE_PHRASES if phrase.lower() in text]
+    reasons = []
+    if words:
+        reasons.append(f"Banned words detected: {', '.join(words)}")
+    if phrases:
+        reasons.append(f"Inappropriate phrases detected: {', '.join(phrases)}")
+    return reasons
+
+@pytest.mark.parametrize("content", [
+    "You people are complete idiots and morons, every last one of you and your friends.",
+    "What a hateful bunch of jerks, I got screwed over by every single one of them.",
+    "He hated the insults, the damned fools and the bastards insulting everyone around.",
+    "Total bullshit from a dumbass asshole who says screw you to anyone who asks nicely.",
+])
+def test_term_matcher_flags_inflected_words(content):
+    # Inflected and compound forms report the same terms as the old substring scan
+    result = check_content(content, use_cache=False)
+    assert [reason for reason in result["reasons"] if "detected:" in reason] == _substring_reasons(content)
+
+def test_term_matcher_rebuilds_on_reload():
+    content = "This perfectly ordinary sentence mentions a zorblax and is long enough to pass the check."
+    assert check_content(content)["approved"]
+    
+    moderation.BANNED_WORDS.append("zorblax")
+    moderation.reload_rules()
+    try:
+        result = check_content(content)
+        assert "Banned words detected: zorblax" in result["reasons"]
+    finally:
+        moderation.BANNED_WORDS.remove("zorblax")
+        moderation.reload_rules()
+    
+    assert check_content(content)["approved"]
+
+def test_term_matcher_large_blocklist():
+    # Thousands of terms should still match in a single pass
+    words = [f"term{i}" for i in range(5000)]
+    matcher = TermMatcher(words, [f"bad phrase {i}" for i in range(1000)])
+    found_words, found_phrases = matcher.find("A post with term42 and term4999 and a bad phrase 7.")
+    # Terms contained in a matched term are reported too, as by a substring scan
+    assert found_words == ["term4", "term42", "term49", "term499", "term4999"]
+    assert found_phrases == ["bad phrase 7"]
+
+def test_rule_timings():
+    content = "This is a completely clean post with appropriate content and sufficient length to pass the minimum requirements."
+    result = check_content(content, "A normal title", profile=True)
+    assert result["approved"]
+    assert set(result["rule_timings"]) >= {name for name, _ in moderation.MODERATION_RULES}
+    assert all(ms >= 0 for ms in result["rule_timings"].values())
+    
+    # Timings are only collected on request
+    assert "rule_timings" not in check_content(content)
+
+def test_content_analysis_shared_views():
+    analysis = moderation.ContentAnalysis("<p>First sentence here. Second one!</p>\n\n<p>New paragraph.</p>", "Title")
+    assert analysis.clean_text == "First sentence here. Second one!\n\nNew paragraph."
+    assert analysis.words == ["first", "sentence", "here", "second", "one", "new", "paragraph"]
+    assert len(analysis.sentences) == 3
+    assert len(analysis.paragraphs) == 2
+    assert analysis.quality == moderation.analyze_content_quality(analysis.content)
+
+def test_check_contents_batch():
+    clean_content = "This is a completely clean post with appropriate content and sufficient length to pass the minimum requirements."
+    items = [(clean_content, "A normal title"), ("Too short", ""), (f"{clean_content} {BANNED_WORDS[0]}", "")]
+    
+    for workers in (None, 2):
+        results = moderation.check_contents_batch(items, workers=workers)
+        assert [result["approved"] for result in results] == [True, False, False]
+        assert any("too short" in reason for reason in results[1]["reasons"])
+        assert any(BANNED_WORDS[0] in reason for reason in results[2]["reasons"])
+
+def test_moderation_executor():
+    from moderation_executor import ModerationExecutor
+    clean_content = "This is a completely clean post with appropriate content and sufficient length to pass the minimum requirements."
+    
+    # Inline fallback with no workers, and the same results from worker processes
+    for workers in (0, 2):
+        executor = ModerationExecutor(workers, queue_size=4, timeout=10)
+        try:
+            assert executor.check_content(clean_content, "A normal title")["approved"]
+            results = executor.check_contents_batch([(clean_content, ""), ("Too short", "")])
+            assert [result["approved"] for result in results] == [True, False]
+        finally:
+            executor.shutdown()
+
+def test_moderation_result_cache():
+    cache = moderation.result_cache
+    cache.clear()
+    content = "A cached post with appropriate content and sufficient length to pass the minimum requirements."
+    
+    first = check_content(content, "Cached title")
+    second = check_content(content, "Cached title")
+    assert second["reasons"] == first["reasons"]
+    assert second["quality_score"] == first["quality_score"]
+    assert cache.info()["hits"] == 1
+    
+    # Results handed out are copies
+    second["reasons"].append("changed")
+    assert check_content(content, "Cached title")["reasons"] == first["reasons"]
+    
+    # A rule change invalidates earlier entries
+    moderation.BANNED_WORDS.append("cached")
+    moderation.reload_rules()
+    try:
+        assert not check_content(content, "Cached title")["approved"]
+    finally:
+        moderation.BANNED_WORDS.remove("cached")
+        moderation.reload_rules()
+    
+    # A result from rules that were reloaded while it ran is not cached
+    stale = dict(first, rule_set_version="replaced rules")
+    cache.put("A result from older rules", "", stale)
+    assert cache.get("A result from older rules") is None
+    
+    # The cache stays within its size bound
+    small = moderation.ModerationCache(maxsize=2)
+    for i in range(3):
+        small.put(f"content {i}", "", {"approved": True, "rule_set_version": moderation.rule_set_version()})
+    assert small.info()["size"] == 2
+    assert small.get("content 0") is None
+    assert small.get("content 2") is not None
+
+def _without_timestamp(result):
+    return {key: value for key, value in result.items() if key != "moderation_timestamp"}
+
+def test_incremental_matches_full_check(monkeypatch):
+    monkeypatch.setattr(moderation.random, "choice", lambda options: options[0])
+    paragraphs = [
+        "This is a completely clean paragraph with appropriate content and a few sentences. It goes on",
+        "and continues here after a blank line! Then it STOPS SHOUTING",
+        "Contact me at someone@example.com about the project?",
+    ]
+    content = "\n\n".join(paragraphs)
+    result, cache = moderation.check_content_incremental(content, "A normal title")
+    assert _without_timestamp(result) == _without_timestamp(check_content(content, "A normal title", use_cache=False))
+    assert len(cache["paragraphs"]) == 3
+    
+    # Only the edited paragraph is scanned again
+    scanned = []
+    scan = moderation._scan_paragraph
+    monkeypatch.setattr(moderation, "_scan_paragraph", lambda paragraph, rules: scanned.append(paragraph) or scan(paragraph, rules))
+    edited = "\n\n".join(paragraphs[:2] + ["Nobody cares about you, you idiot.", paragraphs[2]])
+    result, cache = moderation.check_content_incremental(edited, "A normal title", cache)
+    assert scanned == ["Nobody cares about you, you idiot."]
+    assert _without_timestamp(result) == _without_timestamp(check_content(edited, "A normal title", use_cache=False))
+    assert not result["approved"]
+    
+    # A cache from another rule set is not reused
+    moderation.BANNED_WORDS.append("project")
+    moderation.reload_rules()
+    try:
+        scanned.clear()
+        result, _ = moderation.check_content_incremental(edited, "A normal title", cache)
+        assert len(scanned) == 4
+        assert "Banned words detected: idiot, project" in result["reasons"]
+    finally:
+        moderation.BANNED_WORDS.remove("project")
+        moderation.reload_rules()
+
+def test_fast_fail_mode():
+    # Stops at the first blocking reason, before the content rules run
+    result = check_content(f"Short {BANNED_WORDS[0]}", "AN ANGRY TITLE", mode="fast_fail")
+    assert not result["approved"]
+    assert result["reasons"] == ["Aggressive tone in title (all capital letters)"]
+    assert result["mode"] == "fast_fail"
+    assert "quality_analysis" not in result and "suggestions" not in result
+    
+    clean_content = "This is a completely clean post with appropriate content and sufficient length to pass the minimum requirements."
+    result = check_content(clean_content, "A normal title", mode="fast_fail", with_analysis=True)
+    full = check_content(clean_content, "A normal title", use_cache=False)
+    assert result["approved"] and result["warnings"] == full["warnings"]
+    assert result["quality_score"] == full["quality_score"]
+    
+    with pytest.raises(ValueError):
+        check_content(clean_content, mode="thorough")
+
+def test_content_stream_finds_terms_across_chunks():
+    filler = "Plain sentence with ordinary words for padding. " * 20
+    content = f"<p>{filler}</p> just go to hell. <b>{filler}</b>"
+    cut = content.index("go to hell") + 3
+    for size in (7, 50, len(content)):
+        pieces = [content[i:i + size] for i in range(0, len(content), size)]
+        assert "".join(moderation._clean_pieces(pieces)) == moderation.strip_html(content)
+    
+    # The phrase spans a piece and a chunk boundary
+    result = moderation.check_content_stream([content[:cut], content[cut:]], chunk_size=64, overlap=16)
+    assert not result["approved"]
+    assert "Inappropriate phrases detected: go to hell" in result["reasons"]
+    
+    # Reading stops as soon as the content is too long
+    def endless():
+        while True:
+            yield filler
+    result = moderation.check_content_stream(endless())
+    assert result["reasons"] == [f"Content too long (maximum {moderation.MAX_CONTENT_LENGTH} characters)"]
+    
+    assert moderation.check_content_stream([filler[:400], filler[400:]], "A normal title", chunk_size=64)["approved"]
+
+def test_rules_file_hot_reload(tmp_path, caplog):
+    content = "This perfectly ordinary sentence mentions a zorblax and is long enough to pass the check."
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"banned_words": ["zorblax"]}))
+    store = moderation.RuleStore(str(path), poll_interval=0)
+    first = store.current()
+    assert first.terms.words == ("zorblax",)
+    assert first.terms.phrases == tuple(moderation.INAPPROPRIATE_PHRASES)
+    
+    result = moderation.check_content(content, use_cache=False)
+    assert result["rule_set_version"] == moderation.rule_set_version()
+    
+    analysis = moderation.ContentAnalysis(content, rules=first)
+    assert analysis.found_terms == (["zorblax"], [])
+    
+    # A changed file is picked up on the next read; the old snapshot is untouched
+    path.write_text(json.dumps({"banned_words": ["zorblax", "ordinary"], "inappropriate_phrases": []}))
+    os.utime(path, ns=(time.time_ns(), time.time_ns() + 10 ** 9))
+    second = store.current()
+    assert second is not first and second.version != first.version
+    assert second.terms.words == ("zorblax", "ordinary")
+    assert first.terms.words == ("zorblax",)
+    
+    # A broken file keeps the rules in effect
+    path.write_text(json.dumps({"suspicious_patterns": ["(unclosed"]}))
+    os.utime(path, ns=(time.time_ns(), time.time_ns() + 2 * 10 ** 9))
+    assert store.current() is second
+    assert "could not load" in caplog.text
+
+@pytest.mark.parametrize("data", [
+    {"contextual_patterns": ["x"]},
+    {"contextual_patterns": {"spam": "x"}},
+    {"banned_words": [1]},
+    {"inappropriate_phrases": "x"},
+])
+def test_rules_file_wrong_shape(tmp_path, data):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps(data))
+    with pytest.raises(ValueError):
+        moderation.RuleSet.from_file(str(path))
+    
+    # The store falls back to the built-in rules and does not retry the same file
+    store = moderation.RuleStore(str(path), poll_interval=0)
+    assert store.current().version == moderation.RuleSet.defaults().version
+    assert store._signature == store._file_signature()
+
+def test_vectorized_quality_scores_match_check_content():
+    import numpy as np
+    import scoring
+    
+    contents = [
+        "This is a completely clean post with appropriate content and sufficient length to pass the minimum requirements.",
+        "I hate this awful, terrible and useless waste of an afternoon. " * 3,
+        "word " * 600,
+        "!!! ???",
+    ]
+    analyses = [moderation.ContentAnalysis(content) for content in contents]
+    stats = np.array([
+        [moderation.quality_score_inputs(a.quality, a.sentiment)[name] for name in scoring.FACTOR_INPUTS]
+        for a in analyses
+    ])
+    expected = [moderation._quality_score(a) for a in analyses]
+    assert scoring.score_batch(stats) == pytest.approx(expected)
+    assert expected[-1] == 0
@@ -0,0 +1,106 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import event, update
+
+import database
+import models
+import moderation_jobs
+import settings
+from moderation_executor import ModerationBusy
+
+CLEAN_CONTENT = "This is a completely clean post with appropriate content and sufficient length to pass the minimum requirements."
+
+@pytest.fixture
+def db(empty_database):
+    with database.SessionLocal() as session:
+        yield session
+
+def queue_jobs(db, count=1):
+    """Create `count` draft posts and queue a job for each; returns the job ids."""
+    posts = [models.Post(title=f"Post {i}", content=CLEAN_CONTENT, status="draft") for i in range(count)]
+    db.add_all(posts)
+    db.flush()
+    jobs = [moderation_jobs.enqueue(db, post.id) for post in posts]
+    db.commit()
+    return [job.id for job in jobs]
+
+def job_row(job_id):
+    with database.SessionLocal() as db:
+        return db.get(models.ModerationJob, job_id)
+
+def test_enqueue_reuses_waiting_job_and_leaves_commit_to_caller(db):
+    post = models.Post(title="A post", content=CLEAN_CONTENT, status="draft")
+    db.add(post)
+    db.commit()
+    
+    job = moderation_jobs.enqueue(db, post.id)
+    assert moderation_jobs.enqueue(db, post.id).id == job.id
+    db.rollback()
+    assert db.query(models.ModerationJob).count() == 0
+    
+    job_id = moderation_jobs.enqueue(db, post.id).id
+    db.commit()
+    assert moderation_jobs.drain(db) == 1
+    assert job_row(job_id).status == "done"
+    assert db.get(models.Post, post.id).status == "approved"
+
+def test_claim_next_hands_each_job_to_one_worker(db):
+    first, second = queue_jobs(db, 2)
+    rival_claims = []
+    
+    def rival_claims_first(conn, cursor, statement, *args):
+        # Another worker takes the job between this worker's SELECT and its UPDATE
+        if statement.startswith("UPDATE moderation_jobs") and not rival_claims:
+            rival_claims.append(None)
+            with database.SessionLocal() as rival:
+                rival_claims[0] = moderation_jobs.claim_next(rival)
+    
+    event.listen(database.engine, "before_cursor_execute", rival_claims_first)
+    try:
+        claimed = moderation_jobs.claim_next(db)
+    finally:
+        event.remove(database.engine, "before_cursor_execute", rival_claims_first)
+    
+    assert rival_claims == [first]
+    assert claimed == second
+    assert moderation_jobs.claim_next(db) is None
+    assert job_row(first).attempts == job_row(second).attempts == 1
+
+def test_busy_pool_backs_off_before_retry(db, monkeypatch):
+    monkeypatch.setattr(settings, "MODERATION_JOB_RETRY_DELAY", 60)
+    monkeypatch.setattr(settings, "MODERATION_JOB_MAX_ATTEMPTS", 3)
+    
+    def busy(*args):
+        raise ModerationBusy("Moderation queue is full")
+    
+    monkeypatch.setattr(moderation_jobs.moderation_executor, "check_content_incremental", busy)
+    job_id, = queue_jobs(db)
+    started = datetime.now()
+    assert moderation_jobs.claim_next(db) == job_id
+    moderation_jobs.run_job(db, job_id)
+    
+    job = job_row(job_id)
+    assert job.status == "pending"
+    assert job.not_before.replace(tzinfo=None) >= started + timedelta(seconds=59)
+    assert moderation_jobs.claim_next(db) is None
+    
+    # Once the delay is over it is claimed again, and the next delay doubles
+    db.execute(update(models.ModerationJob).values(not_before=datetime.now() - timedelta(seconds=1)))
+    db.commit()
+    assert moderation_jobs.claim_next(db) == job_id
+    started = datetime.now()
+    moderation_jobs.run_job(db, job_id)
+    assert job_row(job_id).not_before.replace(tzinfo=None) >= started + timedelta(seconds=119)
+
+def test_requeue_stale_returns_abandoned_jobs(db):
+    job_id, = queue_jobs(db)
+    assert moderation_jobs.claim_next(db) == job_id
+    assert moderation_jobs.requeue_stale(db, timedelta(minutes=5)) == 0
+    assert moderation_jobs.claim_next(db) is None
+    
+    db.execute(update(models.ModerationJob).values(started_at=datetime.now() - timedelta(hours=1)))
+    db.commit()
+    assert moderation_jobs.requeue_stale(db, timedelta(minutes=5)) == 1
+    assert job_row(job_id).status == "pending"
+    assert moderation_jobs.claim_next(db) == job_id
@@ -26,11 +26,46 @@ const handleApiError = (error) => {
   }
 };
 
-// Get all posts with optional status filter
+// Get all posts with optional status filter, following X-Next-Cursor across pages
 export const getPosts = async (status = '') => {
   try {
-    const url = status ? `/posts/?status=${status}` : '/posts/';
-    const response = await api.get(url);
+    const params = { fields: 'content', limit: 500 };
+    if (status) {
+      params.status = status;
+    }
+    const posts = [];
+    for (;;) {
+      const response = await api.get('/posts/', { params });
+      posts.push(...response.data);
+      const nextCursor = response.headers['x-next-cursor'];
+      if (!nextCursor) {
+        return posts;
+      }
+      params.cursor = nextCursor;
+    }
+  } catch (error) {
+    handleApiError(error);
+  }
+};
+
+// Search posts by title, tags and content
+export const searchPosts = async (query, status = '', limit = 20, offset = 0) => {
+  try {
+    const params = { q: query, limit, offset };
+    if (status) {
+      params.status = status;
+    }
+    const response = await api.get('/posts/search', { params });
+    return response.data;
+  } catch (error) {
+    handleApiError(error);
+  }
+};
+
+// Get tags in use with their post counts
+export const getTags = async (limit = 100) => {
+  try {
+    const response = await api.get('/tags/', { params: { limit } });
     return response.data;
   } catch (error) {
     handleApiError(error);
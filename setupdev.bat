@@ -13,9 +13,14 @@ echo sqlalchemy==2.0.22 >> backend\requirements.txt
 echo pydantic==2.4.2 >> backend\requirements.txt
 echo python-dotenv==1.0.0 >> backend\requirements.txt
 echo psycopg2-binary==2.9.9 >> backend\requirements.txt
+echo asyncpg==0.29.0 >> backend\requirements.txt
+echo aiosqlite==0.19.0 >> backend\requirements.txt
+echo greenlet==3.0.1 >> backend\requirements.txt
 echo alembic==1.12.0 >> backend\requirements.txt
 echo jinja2==3.1.2 >> backend\requirements.txt
+echo numpy==1.26.2 >> backend\requirements.txt
 echo httpx==0.25.0 >> backend\requirements.txt
+echo orjson==3.9.10 >> backend\requirements.txt
 echo pytest==7.4.2 >> backend\requirements.txt
 
 echo Installing required Python packages...